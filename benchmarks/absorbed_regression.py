@@ -0,0 +1,67 @@
+"""
+Benchmarks for regressions with firm fixed effects absorbed by nbexamples/fixed_effects.py, against
+statsmodels with a dummy variable for each firm, as the number of firms grows
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from fixed_effects import absorbed_ols
+from synthetic_panels import firm_date_panel, trading_days
+
+FIRMS = [100, 300, 1000]
+NUM_DATES = 50
+
+
+def fixed_effects_panel(firms: int):
+    df = firm_date_panel(firms, trading_days(num_days=NUM_DATES))
+    df['X'] = np.random.default_rng(1).normal(size=len(df))
+    return df
+
+
+class FirmFixedEffects:
+    params = FIRMS
+    param_names = ['firms']
+    timeout = 600
+
+    def setup(self, firms):
+        self.df = fixed_effects_panel(firms)
+        self.groups = pd.factorize(self.df['Company'])[0]
+
+    def dummy_ols(self):
+        smf.ols('Return ~ X + C(Company)', data=self.df).fit(cov_type='cluster', cov_kwds={'groups': self.groups})
+
+    def time_dummy_ols(self, firms):
+        self.dummy_ols()
+
+    def peakmem_dummy_ols(self, firms):
+        self.dummy_ols()
+
+    def time_absorbed_ols(self, firms):
+        absorbed_ols(self.df, 'Return', ['X'], 'Company', cluster='Company')
+
+    def peakmem_absorbed_ols(self, firms):
+        absorbed_ols(self.df, 'Return', ['X'], 'Company', cluster='Company')
+
+
+class FirmDateFixedEffects:
+    params = FIRMS
+    param_names = ['firms']
+    timeout = 600
+
+    def setup(self, firms):
+        self.df = fixed_effects_panel(firms)
+        self.groups = pd.factorize(self.df['Company'])[0]
+
+    def time_dummy_ols(self, firms):
+        smf.ols('Return ~ X + C(Company) + C(Date)', data=self.df).fit(
+            cov_type='cluster', cov_kwds={'groups': self.groups}
+        )
+
+    def time_absorbed_ols(self, firms):
+        absorbed_ols(self.df, 'Return', ['X'], ['Company', 'Date'], cluster='Company')
@@ -0,0 +1,54 @@
+"""
+Benchmarks for merging the latest quarterly data onto a daily panel with nbexamples/latest_merge.py,
+against pd_utils.left_merge_latest, as the number of rows grows
+"""
+import os
+import sys
+
+import pandas as pd
+import pd_utils
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from latest_merge import left_merge_latest
+from synthetic_panels import firm_date_panel, num_firms_for_rows, trading_days
+
+ROWS = [10 ** 5, 3 * 10 ** 5, 10 ** 6]
+NUM_DATES = 1250
+NUM_QUARTERS = 28
+MAX_OFFSET = pd.Timedelta(days=180)
+
+
+def daily_and_quarterly(rows: int):
+    num_firms = num_firms_for_rows(rows, NUM_DATES)
+    daily = firm_date_panel(num_firms, trading_days(num_days=NUM_DATES), firm_format='{:06d}')
+    quarterly = firm_date_panel(num_firms, pd.date_range('1999-01-01', periods=NUM_QUARTERS, freq='QS'),
+                                firm_format='{:06d}', missing_rows=0.1, seed=1)
+    daily = daily.rename(columns={'Company': 'GVKEY'})[['GVKEY', 'Date', 'Return']]
+    quarterly = quarterly.rename(columns={'Company': 'GVKEY', 'Return': 'Assets'})[['GVKEY', 'Date', 'Assets']]
+    return daily, quarterly
+
+
+class LeftMergeLatest:
+    params = ROWS
+    param_names = ['rows']
+    timeout = 600
+
+    def setup(self, rows):
+        self.daily, self.quarterly = daily_and_quarterly(rows)
+        self.tradedays = pd_utils.tradedays() * 120
+
+    def time_asof_merge(self, rows):
+        left_merge_latest(self.daily, self.quarterly, on='GVKEY', max_offset=MAX_OFFSET)
+
+    def peakmem_asof_merge(self, rows):
+        left_merge_latest(self.daily, self.quarterly, on='GVKEY', max_offset=MAX_OFFSET)
+
+    def time_asof_merge_trading_days(self, rows):
+        left_merge_latest(self.daily, self.quarterly, on='GVKEY', max_offset=self.tradedays)
+
+    def time_pd_utils(self, rows):
+        pd_utils.left_merge_latest(self.daily, self.quarterly, on='GVKEY', max_offset=MAX_OFFSET)
+
+    def peakmem_pd_utils(self, rows):
+        pd_utils.left_merge_latest(self.daily, self.quarterly, on='GVKEY', max_offset=MAX_OFFSET)
@@ -0,0 +1,152 @@
+"""
+Benchmarks for the operations in the Working with Data in Pandas section of
+nbexamples/Data Management in Python.ipynb, run on synthetic panels of increasing size
+
+peakmem benchmarks measure the peak memory of the whole benchmark process, so they include
+the memory of the input panel created in setup
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+import synthetic_panels
+from synthetic_panels import STATES, num_firms_for_rows, trading_days
+
+ROWS = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+NUM_DATES = 250  # about a year of trading days
+NUM_INTRADAY_DATES = 20
+NUM_PERIODS_PER_DAY = 13  # 30 minute intervals, as in the notebook
+
+
+def firm_date_panel(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Company, State, Date, Return panel like df in the notebook, with at least rows rows,
+    sorted by Company and Date
+    """
+    return synthetic_panels.firm_date_panel(
+        num_firms_for_rows(rows, NUM_DATES), trading_days(num_days=NUM_DATES), seed=seed
+    )
+
+
+def intraday_panel(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Company, Datetime, Price panel like intraday_df in the notebook, with at least rows rows
+    """
+    return synthetic_panels.intraday_panel(
+        num_firms_for_rows(rows, NUM_INTRADAY_DATES * NUM_PERIODS_PER_DAY),
+        trading_days(num_days=NUM_INTRADAY_DATES),
+        periods_per_day=NUM_PERIODS_PER_DAY,
+        seed=seed,
+    )
+
+
+class _PanelBenchmark:
+    params = ROWS
+    param_names = ['rows']
+    timeout = 600
+
+    def setup(self, rows):
+        self.df = firm_date_panel(rows)
+        self.best_firms = ['Firm 1', 'Firm 2']
+        self.employment_df = pd.DataFrame({
+            'State': STATES[:-1],  # leave one state without a match, as PA is in the notebook
+            'Unemployment': np.linspace(0.04, 0.08, len(STATES) - 1),
+        })
+
+
+class Selection(_PanelBenchmark):
+
+    def time_boolean_selection(self, rows):
+        self.df[self.df['State'] == 'FL']
+
+    def peakmem_boolean_selection(self, rows):
+        self.df[self.df['State'] == 'FL']
+
+    def time_isin_selection(self, rows):
+        self.df.loc[self.df['Company'].isin(self.best_firms) & (self.df['Return'] > 0.07), ['Company', 'Return']]
+
+    def peakmem_isin_selection(self, rows):
+        self.df.loc[self.df['Company'].isin(self.best_firms) & (self.df['Return'] > 0.07), ['Company', 'Return']]
+
+
+class GroupbyTransform(_PanelBenchmark):
+
+    def time_transform_mean(self, rows):
+        self.df.groupby(['State', 'Date'])['Return'].transform('mean')
+
+    def peakmem_transform_mean(self, rows):
+        self.df.groupby(['State', 'Date'])['Return'].transform('mean')
+
+
+class Merge(_PanelBenchmark):
+
+    def time_left_merge(self, rows):
+        self.df.merge(self.employment_df, how='left', on='State')
+
+    def peakmem_left_merge(self, rows):
+        self.df.merge(self.employment_df, how='left', on='State')
+
+
+class Concat(_PanelBenchmark):
+
+    def setup(self, rows):
+        super().setup(rows)
+        self.copy_df = self.df.copy()
+        self.copy_df['Extra Column'] = 5
+
+    def time_concat_rows(self, rows):
+        # What df.append(copy_df) does
+        pd.concat([self.df, self.copy_df])
+
+    def peakmem_concat_rows(self, rows):
+        pd.concat([self.df, self.copy_df])
+
+    def time_concat_columns(self, rows):
+        pd.concat([self.df, self.copy_df], axis=1)
+
+    def peakmem_concat_columns(self, rows):
+        pd.concat([self.df, self.copy_df], axis=1)
+
+
+class GroupbyShift(_PanelBenchmark):
+
+    def time_lag(self, rows):
+        self.df.groupby('Company')['Return'].shift(1)
+
+    def peakmem_lag(self, rows):
+        self.df.groupby('Company')['Return'].shift(1)
+
+
+class _IntradayBenchmark:
+    params = ROWS
+    param_names = ['rows']
+    timeout = 600
+
+    def setup(self, rows):
+        self.intraday_df = intraday_panel(rows).set_index('Datetime')
+
+
+class GroupbyResample(_IntradayBenchmark):
+
+    def time_resample_daily_mean(self, rows):
+        self.intraday_df.groupby('Company').resample('1D').mean()
+
+    def peakmem_resample_daily_mean(self, rows):
+        self.intraday_df.groupby('Company').resample('1D').mean()
+
+
+class GroupbyUpsample(_IntradayBenchmark):
+    # Upsampling to 10 minutes through nights and weekends makes about 15 times as many rows,
+    # which doesn't fit in memory for the largest panel
+    params = [rows for rows in ROWS if rows <= 10 ** 6]
+
+    def time_resample_10min_bfill(self, rows):
+        self.intraday_df.groupby('Company').resample('10min').bfill(limit=1)
+
+    def peakmem_resample_10min_bfill(self, rows):
+        self.intraday_df.groupby('Company').resample('10min').bfill(limit=1)
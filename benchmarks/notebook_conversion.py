@@ -0,0 +1,92 @@
+"""
+Benchmarks for converting notebooks to Sphinx Gallery examples with nbexamples/ipynb_to_gallery.py
+"""
+import base64
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from ipynb_to_gallery import convert_ipynb_to_gallery, iter_notebook_cells
+
+OUTPUT_MB = [1, 10, 100]
+
+
+def _synthetic_notebook_path(output_mb: int) -> str:
+    return f'synthetic_{output_mb}mb.ipynb'
+
+
+def write_synthetic_notebook(path: str, output_mb: int, num_cells: int = 50):
+    """
+    Writes a notebook with alternating markdown and code cells, where the code cell outputs
+    contain output_mb MB of base64 image data in total
+    """
+    image_bytes = output_mb * (1 << 20) * 3 // 4 // (num_cells // 2)  # base64 expands by 4/3
+    image_data = base64.b64encode(os.urandom(image_bytes)).decode('ascii')
+    cells: List[Dict[str, Any]] = []
+    for i in range(num_cells // 2):
+        cells.append({
+            'cell_type': 'markdown',
+            'metadata': {},
+            'source': [f'Some text about step {i} using `pandas`'],
+        })
+        cells.append({
+            'cell_type': 'code',
+            'execution_count': i + 1,
+            'metadata': {},
+            'outputs': [
+                {
+                    'data': {
+                        'image/png': image_data,
+                        'text/plain': ['<Figure size 432x288 with 1 Axes>'],
+                    },
+                    'metadata': {},
+                    'output_type': 'display_data',
+                }
+            ],
+            'source': ['ax = df.plot()\n', f'ax.set_title("Step {i}")'],
+        })
+    nb = {
+        'cells': cells,
+        'metadata': {},
+        'nbformat': 4,
+        'nbformat_minor': 4,
+    }
+    with open(path, 'w') as f:
+        json.dump(nb, f, indent=1)
+
+
+class NotebookConversion:
+    params = OUTPUT_MB
+    param_names = ['output_mb']
+    timeout = 600
+
+    def setup_cache(self):
+        for output_mb in OUTPUT_MB:
+            write_synthetic_notebook(_synthetic_notebook_path(output_mb), output_mb)
+
+    def time_read_cells(self, output_mb):
+        list(iter_notebook_cells(_synthetic_notebook_path(output_mb)))
+
+    def peakmem_read_cells(self, output_mb):
+        list(iter_notebook_cells(_synthetic_notebook_path(output_mb)))
+
+    def time_json_load(self, output_mb):
+        # Reference: loading the full notebook as the converter used to
+        with open(_synthetic_notebook_path(output_mb)) as f:
+            json.load(f)
+
+    def peakmem_json_load(self, output_mb):
+        with open(_synthetic_notebook_path(output_mb)) as f:
+            json.load(f)
+
+    def time_convert(self, output_mb):
+        convert_ipynb_to_gallery(_synthetic_notebook_path(output_mb), 'synthetic.py')
+
+    def peakmem_convert(self, output_mb):
+        convert_ipynb_to_gallery(_synthetic_notebook_path(output_mb), 'synthetic.py')
+
+    def time_convert_python_backend(self, output_mb):
+        convert_ipynb_to_gallery(_synthetic_notebook_path(output_mb), 'synthetic.py', backend='python')
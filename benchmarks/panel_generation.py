@@ -0,0 +1,47 @@
+"""
+Benchmarks for generating the synthetic panels in nbexamples/synthetic_panels.py, shared by the
+examples and the other benchmarks
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from synthetic_panels import firm_date_panel, intraday_panel, num_firms_for_rows, trading_days
+
+ROWS = [10 ** 5, 10 ** 6, 10 ** 7]
+
+
+class FirmDatePanel:
+    params = ROWS
+    param_names = ['rows']
+    timeout = 300
+
+    def setup(self, rows):
+        self.dates = trading_days(num_days=250)
+        self.num_firms = num_firms_for_rows(rows, len(self.dates))
+
+    def time_firm_date_panel(self, rows):
+        firm_date_panel(self.num_firms, self.dates)
+
+    def peakmem_firm_date_panel(self, rows):
+        firm_date_panel(self.num_firms, self.dates)
+
+    def time_firm_date_panel_with_missing(self, rows):
+        firm_date_panel(self.num_firms, self.dates, missing_rows=0.1, missing_values=0.05)
+
+
+class IntradayPanel:
+    params = ROWS
+    param_names = ['rows']
+    timeout = 300
+
+    def setup(self, rows):
+        self.dates = trading_days(num_days=20)
+        self.num_firms = num_firms_for_rows(rows, len(self.dates) * 13)
+
+    def time_intraday_panel(self, rows):
+        intraday_panel(self.num_firms, self.dates)
+
+    def peakmem_intraday_panel(self, rows):
+        intraday_panel(self.num_firms, self.dates)
@@ -0,0 +1,43 @@
+"""
+Benchmarks for gap-aware lags with nbexamples/panel_ops.py, against filling in the dense panel
+and shifting within each firm
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from panel_ops import dense_panel_shift, panel_lag
+from synthetic_panels import firm_date_panel, num_firms_for_rows, trading_days
+
+ROWS = [10 ** 5, 10 ** 6, 10 ** 7]
+NUM_DATES = 250
+MISSING_ROWS = 0.1
+
+
+class PanelLag:
+    params = ROWS
+    param_names = ['rows']
+    timeout = 600
+
+    def setup(self, rows):
+        # Enough firms that there are still about rows rows after dropping the missing ones
+        num_firms = num_firms_for_rows(int(rows / (1 - MISSING_ROWS)), NUM_DATES)
+        self.calendar = trading_days(num_days=NUM_DATES)
+        self.df = firm_date_panel(num_firms, self.calendar, missing_rows=MISSING_ROWS)
+        self.shuffled_df = self.df.sample(frac=1, random_state=0)
+
+    def time_panel_lag(self, rows):
+        panel_lag(self.df, 'Return', 'Company', 'Date', calendar=self.calendar)
+
+    def peakmem_panel_lag(self, rows):
+        panel_lag(self.df, 'Return', 'Company', 'Date', calendar=self.calendar)
+
+    def time_panel_lag_unsorted(self, rows):
+        panel_lag(self.shuffled_df, 'Return', 'Company', 'Date', calendar=self.calendar)
+
+    def time_dense_panel_shift(self, rows):
+        dense_panel_shift(self.df, 'Return', 'Company', 'Date', calendar=self.calendar)
+
+    def peakmem_dense_panel_shift(self, rows):
+        dense_panel_shift(self.df, 'Return', 'Company', 'Date', calendar=self.calendar)
@@ -0,0 +1,43 @@
+"""
+Benchmarks for resampling each firm of an intraday panel with nbexamples/panel_ops.py, against
+groupby().resample(), which resamples each firm separately
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from panel_ops import panel_resample, panel_upsample
+from synthetic_panels import intraday_panel, trading_days
+
+FIRMS = [100, 1000, 5000]
+NUM_DATES = 5
+MISSING_ROWS = 0.2
+
+
+class PanelResample:
+    params = FIRMS
+    param_names = ['firms']
+    timeout = 600
+
+    def setup(self, firms):
+        self.df = intraday_panel(firms, trading_days(num_days=NUM_DATES), missing_rows=MISSING_ROWS)
+        self.df.set_index('Datetime', inplace=True)
+
+    def time_panel_resample(self, firms):
+        panel_resample(self.df, 'Company', '1D')
+
+    def time_groupby_resample(self, firms):
+        self.df.groupby('Company')[['Price']].resample('1D').mean()
+
+    def time_panel_upsample(self, firms):
+        panel_upsample(self.df, 'Company', '10min', limit=1)
+
+    def peakmem_panel_upsample(self, firms):
+        panel_upsample(self.df, 'Company', '10min', limit=1)
+
+    def time_groupby_upsample(self, firms):
+        self.df.groupby('Company').resample('10min').bfill(limit=1)
+
+    def peakmem_groupby_upsample(self, firms):
+        self.df.groupby('Company').resample('10min').bfill(limit=1)
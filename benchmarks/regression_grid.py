@@ -0,0 +1,53 @@
+"""
+Benchmarks for fitting a grid of regression specifications with nbexamples/reg_grid.py on
+different numbers of processes, against regtools, which fits them one after another
+"""
+import os
+import sys
+from itertools import combinations
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nbexamples'))
+
+from regtools import reg_for_each_xvar_set_and_produce_summary
+from reg_grid import reg_for_each_xvar_set_and_produce_summary as grid_reg_for_each_xvar_set_and_produce_summary
+from synthetic_panels import firm_date_panel
+
+PROCESSES = [1, 2, 4]
+FIRMS = 500
+XVARS = ['X1', 'X2', 'X3', 'X4', 'X5', 'X6']
+# Every combination of at least two of the x variables, 57 specifications
+XVARS_LIST = [list(xvars) for num in range(2, len(XVARS) + 1) for xvars in combinations(XVARS, num)]
+
+
+def regression_panel(firms: int = FIRMS):
+    df = firm_date_panel(firms, missing_values=0.05)
+    rng = np.random.default_rng(1)
+    for xvar in XVARS:
+        df[xvar] = rng.normal(size=len(df))
+    return df
+
+
+class RegressionGrid:
+    params = PROCESSES
+    param_names = ['processes']
+    timeout = 600
+
+    def setup(self, processes):
+        self.df = regression_panel()
+
+    def time_grid(self, processes):
+        grid_reg_for_each_xvar_set_and_produce_summary(
+            self.df, 'Return', XVARS_LIST, cluster=['Company'], robust=False, processes=processes
+        )
+
+
+class RegtoolsGrid:
+    timeout = 600
+
+    def setup(self):
+        self.df = regression_panel()
+
+    def time_regtools(self):
+        reg_for_each_xvar_set_and_produce_summary(self.df, 'Return', XVARS_LIST, cluster=['Company'], robust=False)
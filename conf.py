@@ -59,9 +59,10 @@ PACKAGE_INSTALL_REQUIRES = [
     # e.g.
     # 'package',
     # 'otherpackage>=1,<2'
-    'pandas',
+    'pandas>=1.2',
     'openpyxl',
     'xlrd',
+    'pyarrow>=1.0',
     'statsmodels',
     'linearmodels',
     'matplotlib',
@@ -0,0 +1,17 @@
+#!/bin/bash
+# Cached docs build output can't be reused across template or notebook converter versions,
+# so clean everything when either changed since the last build
+cd ..
+STAMP_FILE=docsrc/build/.build-stamp
+TEMPLATE_VERSION="$(python -c 'import conf; print(conf._TEMPLATE_VERSION_TUPLE)')"
+CONVERTER_VERSION="$(python -c 'import sys; sys.path.insert(0, "nbexamples"); from ipynb_to_gallery import CONVERTER_VERSION; print(CONVERTER_VERSION)')"
+STAMP="template $TEMPLATE_VERSION converter $CONVERTER_VERSION"
+if [ ! -f "$STAMP_FILE" ] || [ "$(cat "$STAMP_FILE")" != "$STAMP" ]; then
+    echo "No previous build, or template or converter version changed, doing a clean build";
+    cd docsrc
+    make cleandoc
+    cd ..
+    mkdir -p docsrc/build
+    echo "$STAMP" > "$STAMP_FILE"
+fi;
+cd docsrc
@@ -0,0 +1,120 @@
+"""Check that building the docs in parallel gives the same HTML as building them serially.
+Usage: python compare_parallel_build.py [-j auto] (from docsrc, after the examples are converted)
+Does a clean build serially and another in parallel, each into its own folder under
+build/compare-parallel and executing every example, prints how long each took, and exits with an
+error if any page differs. The serial build executes the examples one after another in sphinx-build.
+The parallel build executes them in groups in separate processes with execute_examples.py, then
+reads and writes the pages with sphinx-build -j. What differs between any two builds is left out
+of the comparison: the running times sphinx-gallery adds to the pages, sg_execution_times.html
+which only lists them, and the memory addresses in the output of examples printing objects.
+"""
+import difflib
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from execute_examples import DEFAULT_SOURCE_FOLDER, execute_examples, read_config
+
+DEFAULT_FOLDER = os.path.join('build', 'compare-parallel')
+
+# Pages which only differ between builds in the times sphinx-gallery measured
+_TIMING_PAGES = {'sg_execution_times.html'}
+# Running times and memory addresses, e.g. <DataFrameGroupBy object at 0x7f5bdb153090>
+_VARYING_PATTERN = re.compile(r'\(\s*\d+ minutes\s+[\d.]+ seconds\)|\d+:\d+\.\d+| at 0x[0-9a-f]+')
+
+
+def _forget_executed_examples(source_folder: str = DEFAULT_SOURCE_FOLDER):
+    """
+    sphinx-gallery skips the examples whose .md5 file matches the example, so removing them
+    makes it execute every example again
+    """
+    gallery_dirs = read_config(source_folder)['sphinx_gallery_conf']['gallery_dirs']
+    for gallery_dir in gallery_dirs if isinstance(gallery_dirs, list) else [gallery_dirs]:
+        for path, folders, files in os.walk(os.path.join(source_folder, gallery_dir)):
+            for file in files:
+                if file.endswith('.md5'):
+                    os.remove(os.path.join(path, file))
+
+
+def build(jobs: str, out_folder: str, source_folder: str = DEFAULT_SOURCE_FOLDER) -> float:
+    """
+    Clean build of the docs into out_folder, executing every example
+
+    :param jobs: number of processes executing the examples and for sphinx-build -j, 1 for a serial build
+    :return: the seconds it took
+    """
+    command = [
+        sys.executable, '-m', 'sphinx', '-b', 'html', '-E', '-a', '-q', '-j', jobs,
+        '-d', os.path.join(out_folder, 'doctrees'), source_folder, os.path.join(out_folder, 'html'),
+    ]
+    _forget_executed_examples(source_folder)
+    start_time = time.perf_counter()
+    if jobs != '1':
+        execute_examples(None if jobs == 'auto' else int(jobs), source_folder,
+                         os.path.join(out_folder, 'example-groups'))
+    subprocess.run(command, check=True)
+    return time.perf_counter() - start_time
+
+
+def html_pages(html_folder: str) -> Dict[str, str]:
+    """
+    Contents of the HTML pages in html_folder by their relative paths, without running times
+    and memory addresses
+    """
+    pages = {}
+    for path, folders, files in os.walk(html_folder):
+        for file in files:
+            if not file.endswith('.html') or file in _TIMING_PAGES:
+                continue
+            file_path = os.path.join(path, file)
+            with open(file_path, encoding='utf8') as f:
+                pages[os.path.relpath(file_path, html_folder)] = _VARYING_PATTERN.sub('', f.read())
+    return pages
+
+
+def compare_builds(jobs: str = 'auto', folder: str = DEFAULT_FOLDER, source_folder: str = DEFAULT_SOURCE_FOLDER) -> int:
+    """
+    Builds the docs serially and with jobs processes, printing the time each took and a diff of
+    every page which differs
+
+    :return: the number of pages which differ
+    """
+    serial_folder = os.path.join(folder, 'serial')
+    parallel_folder = os.path.join(folder, 'parallel')
+    serial_seconds = build('1', serial_folder, source_folder)
+    parallel_seconds = build(jobs, parallel_folder, source_folder)
+    print(f'Serial build: {serial_seconds:.1f}s, parallel build (-j {jobs}): {parallel_seconds:.1f}s')
+
+    serial_pages = html_pages(os.path.join(serial_folder, 'html'))
+    parallel_pages = html_pages(os.path.join(parallel_folder, 'html'))
+    num_differences = 0
+    for page in sorted(set(serial_pages) | set(parallel_pages)):
+        serial_page = serial_pages.get(page, '')
+        parallel_page = parallel_pages.get(page, '')
+        if serial_page == parallel_page:
+            continue
+        num_differences += 1
+        print(''.join(difflib.unified_diff(
+            serial_page.splitlines(keepends=True),
+            parallel_page.splitlines(keepends=True),
+            fromfile=f'{page} (serial)',
+            tofile=f'{page} (-j {jobs})',
+        )))
+    print(f'{num_differences} of {len(serial_pages)} pages differ between the serial and parallel builds')
+    return num_differences
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j', '--jobs', default='auto',
+                        help='Number of processes for the parallel build, as for sphinx-build -j')
+    parser.add_argument('-o', '--out-folder', default=DEFAULT_FOLDER,
+                        help='Folder for the two builds')
+    parser.add_argument('-s', '--source-folder', default=DEFAULT_SOURCE_FOLDER,
+                        help='Sphinx source folder with conf.py')
+    args = parser.parse_args()
+    sys.exit(1 if compare_builds(args.jobs, args.out_folder, args.source_folder) else 0)
@@ -0,0 +1,53 @@
+"""
+Sphinx extension with the custom directives and hooks of these docs. None of them keep state
+between documents, so it is declared safe for parallel reading and writing (sphinx-build -j)
+"""
+import random
+import re
+
+from sphinx_gallery.sorting import NumberOfCodeLinesSortKey
+
+from docsrc.directives.auto_summary import AutoSummaryNameOnly
+
+# Examples of a notebook split into sections (ipynb_to_gallery split_sections), e.g. 02_regtools.py
+_SECTION_FILE_PATTERN = re.compile(r'\d+_.*\.py$')
+
+
+def skip(app, what, name, obj, would_skip, options):
+    if name == "__init__":
+        return False
+    return would_skip
+
+
+def seed_random_numbers(gallery_conf, fname):
+    """
+    sphinx-gallery reset_modules function run before each example. The examples use random data,
+    so without this their output would depend on which examples ran before them in the same
+    process, which differs between full and incremental builds
+    """
+    import numpy as np
+
+    random.seed(0)
+    np.random.seed(0)
+
+
+class SectionOrderSortKey(NumberOfCodeLinesSortKey):
+    """
+    sphinx-gallery within_subsection_order which keeps the numbered sections of split notebooks
+    in order, and orders the other examples by their lines of code, the sphinx-gallery default
+    """
+
+    def __call__(self, filename):
+        if _SECTION_FILE_PATTERN.match(filename):
+            return 0, filename
+        return 1, super().__call__(filename)
+
+
+def setup(app):
+    app.connect("autodoc-skip-member", skip)
+    app.add_directive('autosummarynameonly', AutoSummaryNameOnly)
+    app.add_css_file('custom.css')
+    return {
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,179 @@
+"""Execute the gallery examples which changed in parallel, before building the docs.
+Usage: python execute_examples.py [-j auto] (from docsrc, after the examples are converted)
+
+sphinx-gallery executes the examples one after another in the sphinx-build process, and
+sphinx-build -j only reads and writes the pages in parallel. This splits the examples which need to
+run into a group for each process, and runs a sphinx-build for each group at the same time. Each
+group build only generates the gallery for its examples, into a source folder of its own under
+build/example-groups, as builds sharing the gallery folder would write its index at the same time.
+Then the outputs of each group are copied into the gallery folder, with the .md5 files which tell
+sphinx-gallery that the examples are current, so that the docs build afterwards writes their pages
+without executing them again. An example which failed has no .md5 file, so the docs build runs it
+again and reports the error.
+
+The examples don't depend on each other, and seed_random_numbers resets the random numbers before
+each one, so they give the same pages as when run in one process. compare_parallel_build.py checks that.
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from sphinx.config import eval_config_file
+from sphinx_gallery.gen_gallery import DEFAULT_GALLERY_CONF
+from sphinx_gallery.utils import get_md5sum
+
+DEFAULT_SOURCE_FOLDER = 'source'
+DEFAULT_GROUPS_FOLDER = os.path.join('build', 'example-groups')
+
+# Written again by the docs build from all the examples
+_GALLERY_INDEX_FILES = {'index.rst', 'sg_execution_times.rst'}
+
+
+def read_config(source_folder: str = DEFAULT_SOURCE_FOLDER) -> Dict[str, Any]:
+    """
+    Variables of conf.py in source_folder, with the sphinx-gallery defaults for the options
+    sphinx_gallery_conf does not set
+    """
+    config = eval_config_file(os.path.join(os.path.abspath(source_folder), 'conf.py'), None)
+    config['sphinx_gallery_conf'] = {**DEFAULT_GALLERY_CONF, **config.get('sphinx_gallery_conf', {})}
+    return config
+
+
+def _as_list(value) -> List[str]:
+    return value if isinstance(value, list) else [value]
+
+
+def stale_examples(config: Dict[str, Any],
+                   source_folder: str = DEFAULT_SOURCE_FOLDER) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Examples sphinx-gallery would execute, as they match filename_pattern and changed since they were
+    last executed, by absolute path of the examples folder and gallery folder
+    """
+    conf = config['sphinx_gallery_conf']
+    stale: Dict[Tuple[str, str], List[str]] = {}
+    for examples_dir, gallery_dir in zip(_as_list(conf['examples_dirs']), _as_list(conf['gallery_dirs'])):
+        examples_dir = os.path.abspath(os.path.join(source_folder, examples_dir))
+        for path, folders, files in os.walk(examples_dir):
+            folders.sort()
+            for file in sorted(files):
+                file_path = os.path.normpath(os.path.join(path, file))
+                if not file.endswith('.py') or re.search(conf['ignore_pattern'], file_path) or \
+                        not re.search(conf['filename_pattern'], file_path):
+                    continue
+                md5_path = os.path.join(source_folder, gallery_dir, os.path.relpath(file_path, examples_dir)) + '.md5'
+                if os.path.exists(md5_path):
+                    with open(md5_path) as f:
+                        if f.read() == get_md5sum(file_path):
+                            continue
+                stale.setdefault((examples_dir, gallery_dir), []).append(file_path)
+    return stale
+
+
+def split_into_groups(file_paths: List[str], num_groups: int) -> List[List[str]]:
+    """
+    Splits the examples into at most num_groups groups with about the same total size, giving each
+    example, largest first, to the group with the least so far
+    """
+    groups: List[List[str]] = [[] for _ in range(min(num_groups, len(file_paths)))]
+    sizes = [0] * len(groups)
+    for file_path in sorted(file_paths, key=os.path.getsize, reverse=True):
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(file_path)
+        sizes[smallest] += os.path.getsize(file_path)
+    return groups
+
+
+def _group_ignore_pattern(file_paths: List[str]) -> str:
+    """
+    sphinx-gallery ignore_pattern, matched against the path of every example, which ignores all
+    but file_paths
+    """
+    names = '|'.join(re.escape(os.path.normpath(file_path)) for file_path in file_paths)
+    return rf'^(?!(?:{names})$)'
+
+
+def _start_group_build(file_paths: List[str], examples_dir: str, gallery_dir: str, group_folder: str,
+                       source_folder: str, master_doc: str) -> subprocess.Popen:
+    if os.path.exists(group_folder):
+        shutil.rmtree(group_folder)
+    os.makedirs(group_folder)
+    # Sphinx requires the master document, which only needs to reach the gallery
+    with open(os.path.join(group_folder, f'{master_doc}.rst'), 'w') as f:
+        f.write(f'Examples\n========\n\n.. toctree::\n\n   {gallery_dir}/index\n')
+    command = [
+        sys.executable, '-m', 'sphinx', '-b', 'dummy', '-q',
+        '-c', source_folder,
+        '-d', os.path.join(group_folder, '.doctrees'),
+        '-D', f'sphinx_gallery_conf.examples_dirs={examples_dir}',
+        '-D', f'sphinx_gallery_conf.gallery_dirs={gallery_dir}',
+        '-D', f'sphinx_gallery_conf.ignore_pattern={_group_ignore_pattern(file_paths)}',
+        group_folder, os.path.join(group_folder, '.build'),
+    ]
+    return subprocess.Popen(command)
+
+
+def _copy_group_outputs(group_gallery_folder: str, gallery_folder: str):
+    """
+    Copies the generated files of the examples into the gallery folder, the .md5 files last so that
+    an example only counts as current once all its files are there
+    """
+    md5_files = []
+    for path, folders, files in os.walk(group_gallery_folder):
+        out_path = os.path.join(gallery_folder, os.path.relpath(path, group_gallery_folder))
+        os.makedirs(out_path, exist_ok=True)
+        for file in files:
+            if file in _GALLERY_INDEX_FILES or file.endswith('.zip'):
+                continue
+            if file.endswith('.md5'):
+                md5_files.append((os.path.join(path, file), os.path.join(out_path, file)))
+                continue
+            shutil.copyfile(os.path.join(path, file), os.path.join(out_path, file))
+    for file_path, out_file_path in md5_files:
+        shutil.copyfile(file_path, out_file_path)
+
+
+def execute_examples(jobs: Optional[int] = None, source_folder: str = DEFAULT_SOURCE_FOLDER,
+                     groups_folder: str = DEFAULT_GROUPS_FOLDER) -> int:
+    """
+    Executes the examples which changed in up to jobs sphinx-builds at the same time, one for each
+    group of examples, and copies their outputs into the gallery folder
+
+    :param jobs: number of processes, default the number of CPUs. With one process, or one example
+        to run, this does nothing and the docs build executes the examples
+    :return: the number of examples executed
+    """
+    jobs = jobs or os.cpu_count() or 1
+    config = read_config(source_folder)
+    num_executed = 0
+    for (examples_dir, gallery_dir), file_paths in stale_examples(config, source_folder).items():
+        groups = split_into_groups(file_paths, jobs)
+        if len(groups) < 2:
+            continue
+        print(f'Executing {len(file_paths)} examples of {gallery_dir} in {len(groups)} processes')
+        group_folders = [os.path.join(groups_folder, str(i)) for i in range(len(groups))]
+        processes = [
+            _start_group_build(group, examples_dir, gallery_dir, group_folder, source_folder,
+                               config.get('master_doc', 'index'))
+            for group, group_folder in zip(groups, group_folders)
+        ]
+        for process, group_folder in zip(processes, group_folders):
+            if process.wait():
+                # Its examples which did run still have their outputs, the others run in the docs build
+                print(f'sphinx-build for the examples in {group_folder} failed')
+            _copy_group_outputs(os.path.join(group_folder, gallery_dir), os.path.join(source_folder, gallery_dir))
+        num_executed += len(file_paths)
+    return num_executed
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j', '--jobs', default='auto',
+                        help='Number of processes executing examples, auto for the number of CPUs')
+    parser.add_argument('-s', '--source-folder', default=DEFAULT_SOURCE_FOLDER,
+                        help='Sphinx source folder with conf.py')
+    args = parser.parse_args()
+    execute_examples(None if args.jobs == 'auto' else int(args.jobs), args.source_folder)
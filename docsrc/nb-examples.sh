@@ -1,5 +1,16 @@
 #!/bin/bash
 cd ..
-cp -R examples _examples
-python ./nbexamples/ipynb_to_gallery.py ./nbexamples/ --out-folder ./_examples --replace
+mkdir -p _examples
+# Remove examples which were deleted or renamed, as they are not cleaned for the incremental build
+python ./docsrc/prune_examples.py
+# Only copy examples whose content changed, so that the rest are left untouched for the incremental build
+(cd examples && find . -type f -not -path '*/__pycache__/*') | while read -r file; do
+    if ! cmp -s "examples/$file" "_examples/$file"; then
+        mkdir -p "$(dirname "_examples/$file")"
+        cp "examples/$file" "_examples/$file"
+    fi
+done
+python ./nbexamples/ipynb_to_gallery.py ./nbexamples/ --out-folder ./_examples --incremental --jobs 0 "$@"
+# Then the gallery pages of those examples and of deleted notebooks
+python ./docsrc/prune_examples.py --pages
 cd docsrc
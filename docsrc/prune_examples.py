@@ -0,0 +1,106 @@
+"""Remove what the incremental docs build left behind from examples which were deleted or renamed.
+Usage: python prune_examples.py [--pages] (see nb-examples.sh)
+Examples are copied from examples into _examples only when they change, so a deleted or renamed
+example would otherwise stay in _examples. Converted notebooks, which are also in _examples, are
+kept, as the notebook converter removes those of deleted notebooks itself using its manifest.
+sphinx-gallery never removes the pages it generated, so with --pages, the gallery pages of examples
+which are no longer in _examples are removed instead.
+"""
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Set
+
+DOCS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_FOLDER = os.path.join(DOCS_FOLDER, '..', 'examples')
+OUT_FOLDER = os.path.join(DOCS_FOLDER, '..', '_examples')
+MANIFEST_PATH = OUT_FOLDER + '.manifest.json'
+GALLERY_FOLDER = os.path.join(DOCS_FOLDER, 'source', 'auto_examples')
+
+# Pages sphinx-gallery generates for a gallery rather than for an example
+_GALLERY_PAGES = {'index.rst', 'sg_execution_times.rst'}
+
+
+def _converted_notebook_outputs(manifest_path: str) -> Set[str]:
+    if not os.path.exists(manifest_path):
+        return set()
+    try:
+        with open(manifest_path) as f:
+            notebooks = json.load(f).get('notebooks', {})
+    except ValueError:
+        return set()
+    return {os.path.normpath(entry['output']) for entry in notebooks.values()}
+
+
+def _is_within(rel_path: str, folders: Set[str]) -> bool:
+    return any(rel_path == folder or rel_path.startswith(folder + os.path.sep) for folder in folders)
+
+
+def prune_examples(examples_folder: str = EXAMPLES_FOLDER, out_folder: str = OUT_FOLDER,
+                   manifest_path: str = MANIFEST_PATH):
+    """
+    Removes the files in out_folder which are neither in examples_folder nor converted notebooks
+    """
+    if not os.path.isdir(out_folder):
+        return
+    notebook_outputs = _converted_notebook_outputs(manifest_path)
+    for path, folders, files in os.walk(out_folder, topdown=False):
+        rel_folder = os.path.relpath(path, out_folder)
+        for file in files:
+            rel_path = os.path.normpath(os.path.join(rel_folder, file))
+            if os.path.exists(os.path.join(examples_folder, rel_path)) or _is_within(rel_path, notebook_outputs):
+                continue
+            print(f'Removing {os.path.join(path, file)} as it is no longer in {examples_folder}')
+            os.remove(os.path.join(path, file))
+        if path != out_folder and not os.listdir(path):
+            os.rmdir(path)
+
+
+def prune_gallery_pages(out_folder: str = OUT_FOLDER, gallery_folder: str = GALLERY_FOLDER):
+    """
+    Removes the pages sphinx-gallery generated in gallery_folder for examples which are no longer
+    in out_folder, along with their images, and sub-galleries whose folder was removed
+    """
+    if not os.path.isdir(gallery_folder):
+        return
+    for path, folders, files in os.walk(gallery_folder):
+        rel_folder = os.path.relpath(path, gallery_folder)
+        # Images are removed along with their pages
+        folders[:] = [folder for folder in folders if folder != 'images']
+        for folder in list(folders):
+            if os.path.isdir(os.path.join(out_folder, rel_folder, folder)):
+                continue
+            print(f'Removing {os.path.join(path, folder)} as it is no longer in {out_folder}')
+            shutil.rmtree(os.path.join(path, folder))
+            folders.remove(folder)
+        for file in files:
+            if not file.endswith('.rst') or file in _GALLERY_PAGES:
+                continue
+            stem = file[:-len('.rst')]
+            if os.path.exists(os.path.join(out_folder, rel_folder, stem + '.py')):
+                continue
+            print(f'Removing the gallery page of {stem} as it is no longer in {out_folder}')
+            _remove_generated_files(path, stem)
+
+
+def _remove_generated_files(gallery_path: str, stem: str):
+    # The page, downloads and code objects are named after the example, images are sphx_glr_{stem}_001.png etc.
+    image_pattern = re.compile(rf'sphx_glr_{re.escape(stem)}_(?:\d+|thumb)\.\w+')
+    for file in os.listdir(gallery_path):
+        if file.startswith(stem + '.') or file == f'{stem}_codeobj.pickle':
+            os.remove(os.path.join(gallery_path, file))
+    for images_path in (os.path.join(gallery_path, 'images'), os.path.join(gallery_path, 'images', 'thumb')):
+        if not os.path.isdir(images_path):
+            continue
+        for file in os.listdir(images_path):
+            if image_pattern.fullmatch(file):
+                os.remove(os.path.join(images_path, file))
+
+
+if __name__ == '__main__':
+    if '--pages' in sys.argv[1:]:
+        prune_gallery_pages()
+    else:
+        prune_examples()
@@ -25,9 +25,11 @@ import sphinx_rtd_theme
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__name__), '..')))
 
 sys.path.insert(0, os.path.abspath('../..'))
+sys.path.insert(0, os.path.abspath('../../nbexamples'))
 import conf
 import version as vs
-from docsrc.directives.auto_summary import AutoSummaryNameOnly
+from ipynb_to_gallery import gallery_filename_pattern
+from docsrc.directives.extension import SectionOrderSortKey, seed_random_numbers
 
 # -- General configuration ------------------------------------------------
 
@@ -53,7 +55,9 @@ extensions = [
     'sphinx_rtd_theme',
     'sphinx_gallery.gen_gallery',
     'sphinx_copybutton',
-    'sphinx_sitemap'
+    'sphinx_sitemap',
+    # autosummarynameonly directive, autodoc skip handler and custom.css
+    'docsrc.directives.extension',
 ]
 
 # Options for sphinx_autodoc_typehints
@@ -114,7 +118,14 @@ html_baseurl = conf.PACKAGE_URLS['Documentation'] + '/'
 sphinx_gallery_conf = {
     'examples_dirs': '../../_examples',   # path to your example scripts
     'gallery_dirs': 'auto_examples',  # path to where to save gallery generated output
-    'filename_pattern': '/',  # re to match examples .py files that should be run to generate output. Set as / for all
+    # re to match examples .py files that should be run to generate output. Set as / for all. Matches all
+    # except the examples which were rendered from the outputs stored in the notebook (make github-stored-outputs)
+    'filename_pattern': gallery_filename_pattern('../../_examples'),
+    # Notebooks split into sections (ipynb_to_gallery split_sections) are numbered in order,
+    # other examples keep the default order
+    'within_subsection_order': SectionOrderSortKey,
+    # Also seed the random numbers, so that the examples give the same output in every build
+    'reset_modules': ('matplotlib', 'seaborn', seed_random_numbers),
     'reference_url': {
         # The module you locally document uses None
         'sphinx_gallery': None,
@@ -233,15 +244,3 @@ texinfo_documents = [
      author, conf.PACKAGE_NAME, conf.PACKAGE_SHORT_DESCRIPTION,
      'Miscellaneous'),
 ]
-
-
-def skip(app, what, name, obj, would_skip, options):
-    if name == "__init__":
-        return False
-    return would_skip
-
-
-def setup(app):
-    app.connect("autodoc-skip-member", skip)
-    app.add_directive('autosummarynameonly', AutoSummaryNameOnly)
-    app.add_css_file('custom.css')
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""Regressions with fixed effects absorbed rather than estimated as dummy variables.
+Used in Data Management in Python and benchmarked in benchmarks/absorbed_regression.py.
+
+C(...) in a statsmodels formula adds a dummy column for every level, so a fixed effect for each firm
+or date makes a dense matrix of rows times levels, which soon takes more time and memory than the rest
+of the regression. absorbed_ols instead removes the fixed effects from the y and x variables with
+linearmodels' PanelOLS: subtracting group means for one fixed effect and solving a sparse least squares
+problem for two. Only the coefficients of the x variables are estimated, and they and their standard
+errors are the same as in the dummy variable regression, including the small sample corrections
+statsmodels makes for clustered standard errors.
+"""
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from linearmodels import PanelOLS
+from linearmodels.panel.results import PanelEffectsResults
+
+Columns = Union[str, Sequence[str]]
+
+# statsmodels cov_type: linearmodels cov_type and options giving the same standard errors
+COV_TYPES = {
+    'nonrobust': ('unadjusted', {}),
+    'HC1': ('robust', {}),
+    'cluster': ('clustered', {'group_debias': True}),
+}
+
+
+def _as_list(columns: Optional[Columns]) -> list:
+    if columns is None:
+        return []
+    if isinstance(columns, str):
+        return [columns]
+    return list(columns)
+
+
+def _codes(df: pd.DataFrame, columns: Sequence[str], index: pd.MultiIndex) -> pd.DataFrame:
+    return pd.DataFrame({col: pd.factorize(df[col])[0] for col in columns}, index=index)
+
+
+def absorbed_ols(df: pd.DataFrame, yvar: str, xvars: Sequence[str], fe: Columns,
+                 cluster: Optional[Columns] = None, cov_type: Optional[str] = None) -> PanelEffectsResults:
+    """
+    OLS of yvar on xvars with fixed effects for the levels of the fe columns, the same as
+    smf.ols('yvar ~ xvars + C(fe)') without the estimates of the fixed effects and constant.
+    Rows missing any of the columns are dropped
+
+    :param fe: one or two columns
+    :param cluster: one or two columns to cluster the standard errors by
+    :param cov_type: 'nonrobust', 'HC1' or 'cluster', as in statsmodels. Default 'cluster' when
+        cluster is passed, otherwise 'nonrobust'
+    :return: linearmodels results, with params, std_errors, tstats, pvalues and summary
+    """
+    xvars = list(xvars)
+    fe = _as_list(fe)
+    cluster = _as_list(cluster)
+    if not 1 <= len(fe) <= 2:
+        raise ValueError(f'must pass one or two fixed effects, got {fe}')
+    cov_type = cov_type or ('cluster' if cluster else 'nonrobust')
+    if cov_type not in COV_TYPES:
+        raise ValueError(f'cov_type must be one of {list(COV_TYPES)}, got {cov_type}')
+    if (cov_type == 'cluster') != bool(cluster):
+        raise ValueError('pass cluster with, and only with, cov_type cluster')
+
+    columns = list(dict.fromkeys([yvar] + xvars + fe + cluster))
+    df = df[columns].dropna()
+    # PanelOLS needs an entity and time index, but the effects are passed separately,
+    # so each row is its own entity
+    index = pd.MultiIndex.from_arrays([np.arange(len(df)), np.zeros(len(df), dtype=int)])
+    y = pd.Series(df[yvar].to_numpy(), index=index, name=yvar)
+    x = pd.DataFrame(df[xvars].to_numpy(), index=index, columns=xvars)
+    model = PanelOLS(y, x, other_effects=_codes(df, fe, index))
+
+    linearmodels_cov_type, cov_kwargs = COV_TYPES[cov_type]
+    if cluster:
+        cov_kwargs = dict(cov_kwargs, clusters=_codes(df, cluster, index))
+    # Count the fixed effects in the degrees of freedom, as the dummy variable regression does, rather than
+    # letting linearmodels leave out those nested in the clusters
+    return model.fit(cov_type=linearmodels_cov_type, debiased=True, auto_df=False, count_effects=True, **cov_kwargs)
@@ -1,50 +1,714 @@
 """Convert jupyter notebook to sphinx gallery notebook styled examples.
 Usage: python ipynb_to_gallery.py <notebook.ipynb>
 Dependencies:
-pypandoc: install using `pip install pypandoc`
+pypandoc: install using `pip install pypandoc`, not needed with --backend python
 """
+import difflib
+import hashlib
+import io
 import os
-from typing import Optional
+import re
+import shutil
+import sys
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional, List, Set, Dict, Any, Tuple, Iterable, Iterator, TextIO, Type, NamedTuple, Union, Pattern, Match
 
-import pypandoc as pdoc
 import json
 
+# markdown_rst is next to this script, which is also imported from other folders, as by the docs build
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from markdown_rst import markdown_to_rst
+
+try:
+    import pypandoc as pdoc
+except ImportError:
+    # Only needed for the pandoc backend
+    pdoc = None
+
+# Increment whenever a change to the converter changes its output, so that incremental conversion redoes everything
+CONVERTER_VERSION = 4
+
+# rst comment added to the docstring of gallery examples rendered from stored outputs, which should not be executed
+STORED_OUTPUTS_MARKER = '.. sphinx-gallery-stored-outputs'
+
+# Key in the notebook metadata for options of this converter
+NOTEBOOK_METADATA_KEY = 'ipynb_to_gallery'
+
+# Markdown which pandoc renders with document-level output (link targets, substitution
+# definitions, footnotes) would come out differently if converted as part of a larger document
+_DOCUMENT_LEVEL_MD_PATTERN = re.compile(r'!\[|\[\^|^\s{0,3}\[[^\]]+\]:', re.MULTILINE)
+_ATX_HEADING_PATTERN = re.compile(r'^\s{0,3}#{1,6}\s+(.*?)(?:\s+#+)?\s*$', re.MULTILINE)
+_SETEXT_HEADING_PATTERN = re.compile(r'^(\S.*)\n\s{0,3}(?:=+|-+)\s*$', re.MULTILINE)
+# Level two ATX heading, where notebooks split into an example per section are split
+_SECTION_HEADING_PATTERN = re.compile(r'^\s{0,3}##\s+(.*?)(?:\s+#+)?\s*$', re.MULTILINE)
+# Markdown link to a heading in the same notebook, e.g. [regtools](#regtools)
+_ANCHOR_LINK_PATTERN = re.compile(r'\]\(#([^)\s]+)\)')
+
+
+def _heading_keys(md_source: str) -> Set[str]:
+    headings = _ATX_HEADING_PATTERN.findall(md_source) + _SETEXT_HEADING_PATTERN.findall(md_source)
+    # Conservative version of the pandoc identifier, so anything pandoc would consider duplicated is caught
+    return {re.sub(r'[^0-9a-z]', '', heading.lower()) for heading in headings}
+
+
+class MarkdownToRstBackend:
+    """
+    Base class for converters of markdown cell sources to rst. Subclasses must implement convert
+    and may override convert_cells to convert a notebook's cells more efficiently than one at a time.
+    """
+    name: str = ''
+
+    def convert(self, md_source: str) -> str:
+        raise NotImplementedError
+
+    def convert_cells(self, md_sources: List[str], batch: bool = True) -> List[str]:
+        return [self.convert(md_source) for md_source in md_sources]
+
+
+class PandocBackend(MarkdownToRstBackend):
+    """
+    Converts with the pandoc binary through pypandoc
+    """
+    name = 'pandoc'
+
+    def convert(self, md_source: str) -> str:
+        if pdoc is None:
+            raise ImportError('pypandoc is required for the pandoc backend, install using `pip install pypandoc`')
+        return pdoc.convert_text(md_source, 'rst', 'md')
+
+    def convert_cells(self, md_sources: List[str], batch: bool = True) -> List[str]:
+        """
+        With batch=True, all the cells which can be safely converted together are joined with
+        sentinel paragraphs and sent through pandoc in one call, giving the same output as
+        converting each cell individually.
+        """
+        rst_sources: List[Optional[str]] = [None] * len(md_sources)
+        if batch:
+            batch_idxs: List[int] = []
+            seen_headings: Set[str] = set()
+            for i, md_source in enumerate(md_sources):
+                headings = _heading_keys(md_source)
+                if not md_source.strip() or _DOCUMENT_LEVEL_MD_PATTERN.search(md_source) or headings & seen_headings:
+                    # Converted individually below
+                    continue
+                seen_headings.update(headings)
+                batch_idxs.append(i)
+
+            if len(batch_idxs) > 1:
+                sentinel = f'ipynbtogallerycellbreak{uuid.uuid4().hex}'
+                joined_md = f'\n\n{sentinel}\n\n'.join(md_sources[i] for i in batch_idxs)
+                joined_rst = self.convert(joined_md)
+                rst_chunks = joined_rst.split(f'\n\n{sentinel}\n\n')
+                if len(rst_chunks) == len(batch_idxs):
+                    # Pandoc ends its output with a newline, which was consumed by the split for all but the last
+                    rst_chunks = [chunk + '\n' for chunk in rst_chunks[:-1]] + rst_chunks[-1:]
+                    for i, rst_source in zip(batch_idxs, rst_chunks):
+                        rst_sources[i] = rst_source
+                # Otherwise a sentinel got swallowed by some markdown construct, fall back to individual conversion
+
+        return [
+            self.convert(md_source) if rst_source is None else rst_source
+            for md_source, rst_source in zip(md_sources, rst_sources)
+        ]
+
+
+class PythonBackend(MarkdownToRstBackend):
+    """
+    Converts in-process with markdown_rst, which needs no pandoc binary but only handles the
+    subset of markdown used in the example notebooks
+    """
+    name = 'python'
+
+    def convert(self, md_source: str) -> str:
+        return markdown_to_rst(md_source)
+
+
+BACKENDS: Dict[str, Type[MarkdownToRstBackend]] = {
+    backend.name: backend for backend in (PandocBackend, PythonBackend)
+}
+DEFAULT_BACKEND = PandocBackend.name
+
+
+def get_backend(name: str) -> MarkdownToRstBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f'No markdown to rst backend {name}, available backends are {", ".join(BACKENDS)}')
+
+
+def markdown_cells_to_rst(md_sources: List[str], batch: bool = True, backend: str = DEFAULT_BACKEND) -> List[str]:
+    return get_backend(backend).convert_cells(md_sources, batch=batch)
+
+
+class _JsonStream:
+    """
+    Minimal pull parser which reads a JSON file in chunks, so that values which are skipped
+    (such as notebook outputs with embedded images) are never held in memory as a whole.
+    """
+    chunk_size = 1 << 20
+    _whitespace_pattern = re.compile(r'[ \t\n\r]*')
+    _scalar_pattern = re.compile(r'[^,\]}\s]*')
+    _structural_pattern = re.compile(r'["\[\]{}]')
+
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # Drop the consumed part of the buffer
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _match_end(self, pattern: Pattern[str]) -> int:
+        # Only used with patterns which match the empty string, so they always match
+        match: Optional[Match[str]] = pattern.match(self._buf, self._pos)
+        assert match is not None
+        return match.end()
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = self._match_end(self._whitespace_pattern)
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON')
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f'Expected {char!r} in JSON but got {self._buf[self._pos]!r}')
+        self._pos += 1
+
+    def _string_end(self, keep: bool) -> int:
+        # The opening quote is at the current position, returns the index of the closing quote
+        search = self._pos + 1
+        while True:
+            end = self._buf.find('"', search)
+            if end == -1:
+                if not keep:
+                    # Only the trailing run of backslashes matters to tell whether the next quote is escaped
+                    self._pos = max(self._pos, len(self._buf.rstrip('\\')) - 1)
+                searched = len(self._buf) - self._pos
+                if not self._fill():
+                    raise ValueError('Unterminated string in JSON')
+                search = self._pos + searched
+                continue
+            backslash_idx = end - 1
+            while self._buf[backslash_idx] == '\\':
+                backslash_idx -= 1
+            if (end - 1 - backslash_idx) % 2 == 0:
+                return end
+            search = end + 1
+
+    def _read_string(self) -> str:
+        end = self._string_end(keep=True)
+        value = json.loads(self._buf[self._pos:end + 1])
+        self._pos = end + 1
+        return value
+
+    def _read_scalar(self) -> Any:
+        while True:
+            end = self._match_end(self._scalar_pattern)
+            if end < len(self._buf) or not self._fill():
+                break
+        value = json.loads(self._buf[self._pos:end])
+        self._pos = end
+        return value
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Yields each key of an object, the caller must consume the value with read_value or skip_value
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise ValueError('Expected object key in JSON')
+            key = self._read_string()
+            self._expect(':')
+            yield key
+            end_char = self._peek()
+            self._pos += 1
+            if end_char == '}':
+                return
+            if end_char != ',':
+                raise ValueError(f'Expected , or }} in JSON but got {end_char!r}')
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Yields once per item of an array, the caller must consume the item with read_value or skip_value
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield None
+            end_char = self._peek()
+            self._pos += 1
+            if end_char == ']':
+                return
+            if end_char != ',':
+                raise ValueError(f'Expected , or ] in JSON but got {end_char!r}')
+
+    def read_value(self) -> Any:
+        char = self._peek()
+        if char == '"':
+            return self._read_string()
+        if char == '[':
+            return [self.read_value() for _ in self.iter_array()]
+        if char == '{':
+            return {key: self.read_value() for key in self.iter_object()}
+        return self._read_scalar()
+
+    def skip_value(self):
+        char = self._peek()
+        if char == '"':
+            self._pos = self._string_end(keep=False) + 1
+            return
+        if char not in '[{':
+            self._read_scalar()
+            return
+        depth = 0
+        while True:
+            match = self._structural_pattern.search(self._buf, self._pos)
+            if match is None:
+                self._pos = len(self._buf)
+                if not self._fill():
+                    raise ValueError('Unexpected end of JSON')
+                continue
+            self._pos = match.start()
+            if match.group() == '"':
+                self._pos = self._string_end(keep=False) + 1
+                continue
+            self._pos += 1
+            depth += 1 if match.group() in '[{' else -1
+            if depth == 0:
+                return
+
+
+class NotebookCell(NamedTuple):
+    cell_type: str
+    source: str
+    execution_count: Optional[int] = None
+    # Only read when requested, as they may hold large embedded images
+    outputs: Optional[List[Dict[str, Any]]] = None
+
+
+def _read_cell(stream: _JsonStream, include_outputs: bool) -> NotebookCell:
+    cell_type = ''
+    source = ''
+    execution_count = None
+    outputs = None
+    for cell_key in stream.iter_object():
+        if cell_key == 'cell_type':
+            cell_type = stream.read_value()
+        elif cell_key == 'source':
+            source = stream.read_value()
+            if isinstance(source, list):
+                source = ''.join(source)
+        elif cell_key == 'execution_count':
+            execution_count = stream.read_value()
+        elif cell_key == 'outputs' and include_outputs:
+            outputs = stream.read_value()
+        else:
+            stream.skip_value()
+    return NotebookCell(cell_type, source, execution_count, outputs)
+
+
+def _iter_notebook(file_path: str, include_outputs: bool = False, metadata: Optional[Dict[str, Any]] = None,
+                   skip_cells: bool = False) -> Iterator[NotebookCell]:
+    """
+    If metadata is passed, it is updated with the notebook metadata, which usually comes after the cells
+    """
+    with open(file_path, encoding='utf-8') as f:
+        stream = _JsonStream(f)
+        for key in stream.iter_object():
+            if key == 'cells' and not skip_cells:
+                for _ in stream.iter_array():
+                    yield _read_cell(stream, include_outputs)
+            elif key == 'metadata' and metadata is not None:
+                metadata.update(stream.read_value())
+            else:
+                stream.skip_value()
+
+
+def iter_notebook_cells(file_path: str, include_outputs: bool = False) -> Iterator[NotebookCell]:
+    """
+    Yields each cell in the notebook, streaming through the file without loading metadata, attachments,
+    or (unless include_outputs) outputs
+    """
+    yield from _iter_notebook(file_path, include_outputs)
+
+
+def read_notebook(file_path: str, include_outputs: bool = False) -> Tuple[List[NotebookCell], Dict[str, Any]]:
+    """
+    Cells as in iter_notebook_cells and the notebook metadata, in one pass through the file
+    """
+    metadata: Dict[str, Any] = {}
+    cells = list(_iter_notebook(file_path, include_outputs, metadata))
+    return cells, metadata
+
+
+def read_notebook_metadata(file_path: str) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = {}
+    for _ in _iter_notebook(file_path, metadata=metadata, skip_cells=True):
+        pass
+    return metadata
+
+
+def splits_sections(metadata: Dict[str, Any]) -> bool:
+    """
+    Whether the notebook asks to be split into an example per section, with
+    "ipynb_to_gallery": {"split_sections": true} in its metadata
+    """
+    return bool(metadata.get(NOTEBOOK_METADATA_KEY, {}).get('split_sections', False))
+
+
+def stored_outputs_are_current(cells: List[NotebookCell]) -> bool:
+    """
+    Stored outputs can be used when every code cell has been run, in order, in a single session
+    """
+    execution_counts: List[int] = []
+    for cell in cells:
+        if cell.cell_type != 'code' or not cell.source.strip():
+            continue
+        if cell.execution_count is None:
+            return False
+        execution_counts.append(cell.execution_count)
+    if not execution_counts:
+        return False
+    return all(later > earlier for earlier, later in zip(execution_counts, execution_counts[1:]))
+
+
+def _mime_text(value: Union[str, List[str]]) -> str:
+    return value if isinstance(value, str) else ''.join(value)
 
-def convert_ipynb_to_gallery(file_path: str, out_path: Optional[str] = None):
-    if out_path is None:
-        out_path = file_path.replace('.ipynb', '.py')
 
-    python_file = ""
+def _indent(text: str, spaces: int = 4) -> str:
+    return '\n'.join(' ' * spaces + line if line.strip() else '' for line in text.rstrip().split('\n'))
 
-    nb_dict = json.load(open(file_path))
-    cells = nb_dict['cells']
 
-    for i, cell in enumerate(cells):
-        if i == 0:
-            assert cell['cell_type'] == 'markdown', \
-                'First cell has to be markdown'
+def _text_output_rst(text: str) -> str:
+    # Same structure sphinx-gallery uses for captured output
+    return '.. rst-class:: sphx-glr-script-out\n\n Out:\n\n .. code-block:: none\n\n' + _indent(text)
 
-            md_source = ''.join(cell['source'])
-            rst_source = pdoc.convert_text(md_source, 'rst', 'md')
-            python_file = '"""\n' + rst_source + '\n"""'
+
+def _html_output_rst(html: str) -> str:
+    return '.. raw:: html\n\n' + _indent(
+        f'<div class="output_subarea output_html rendered_html output_result">\n{html.strip()}\n</div>'
+    )
+
+
+def outputs_to_rst(outputs: List[Dict[str, Any]]) -> str:
+    """
+    Renders a code cell's stored outputs as rst, the richest available format for each output
+    """
+    blocks = []
+    for output in outputs:
+        output_type = output.get('output_type')
+        if output_type == 'stream':
+            # sphinx-gallery only shows stdout as well
+            if output.get('name') == 'stdout':
+                blocks.append(_text_output_rst(_mime_text(output.get('text', ''))))
+        elif output_type in ('execute_result', 'display_data'):
+            data = output.get('data', {})
+            if 'text/html' in data:
+                blocks.append(_html_output_rst(_mime_text(data['text/html'])))
+            elif 'image/png' in data or 'image/jpeg' in data:
+                mime_type = 'image/png' if 'image/png' in data else 'image/jpeg'
+                image_data = _mime_text(data[mime_type]).replace('\n', '')
+                blocks.append(_html_output_rst(f'<img src="data:{mime_type};base64,{image_data}" />'))
+            elif 'image/svg+xml' in data:
+                blocks.append(_html_output_rst(_mime_text(data['image/svg+xml'])))
+            elif 'text/plain' in data:
+                blocks.append(_text_output_rst(_mime_text(data['text/plain'])))
+        elif output_type == 'error':
+            blocks.append(_text_output_rst(f"{output.get('ename', '')}: {output.get('evalue', '')}"))
+    return '\n\n'.join(blocks)
+
+
+def _rst_comment_block(rst_source: str) -> str:
+    commented_source = '\n'.join(['# ' + x for x in
+                                  rst_source.split('\n')])
+    return '\n\n\n' + '#' * 70 + '\n' + commented_source
+
+
+def _write_gallery_example(f: TextIO, cells: List[NotebookCell], rst_sources: Dict[int, str],
+                           use_stored_outputs: bool, cell_idxs: Optional[List[int]] = None):
+    """
+    Writes the cells at cell_idxs, default all, as a gallery example. The first must be markdown, which
+    becomes the docstring
+    """
+    if cell_idxs is None:
+        cell_idxs = list(range(len(cells)))
+    for position, i in enumerate(cell_idxs):
+        cell = cells[i]
+        if position == 0:
+            marker = '\n' + STORED_OUTPUTS_MARKER + '\n' if use_stored_outputs else ''
+            part = '"""\n' + rst_sources[i] + marker + '\n"""'
+        elif cell.cell_type == 'markdown':
+            part = _rst_comment_block(rst_sources[i])
+        elif cell.cell_type == 'code':
+            part = '\n' * 2 + cell.source
+            output_rst = outputs_to_rst(cell.outputs or []) if use_stored_outputs else ''
+            if output_rst:
+                part += _rst_comment_block(output_rst)
         else:
-            if cell['cell_type'] == 'markdown':
-                md_source = ''.join(cell['source'])
-                rst_source = pdoc.convert_text(md_source, 'rst', 'md')
-                commented_source = '\n'.join(['# ' + x for x in
-                                              rst_source.split('\n')])
-                python_file = python_file + '\n\n\n' + '#' * 70 + '\n' + \
-                    commented_source
-            elif cell['cell_type'] == 'code':
-                source = ''.join(cell['source'])
-                python_file = python_file + '\n' * 2 + source
-
-    python_file = python_file.replace("\n%", "\n# %")
-    with open(out_path, 'w') as f:
-        f.write(python_file)
-
-
-def convert_all_in_folder_to_gallery(folder: str, out_folder: Optional[str] = None, replace: bool = False):
+            continue
+        # Every part after the first starts with a newline, so no magic can span two parts
+        f.write(part.replace("\n%", "\n# %"))
+
+
+def split_notebook_sections(cells: List[NotebookCell]) -> Tuple[List[NotebookCell], List[int], List[List[int]]]:
+    """
+    Splits the notebook at level two (##) headings after its first cell, which holds the title and introduction.
+    A markdown cell with text before a heading is split in two at the heading.
+
+    Returns the cells after splitting, the indices of the setup cells between the first cell and the first
+    section, and the indices of the cells of each section
+    """
+    split_cells: List[NotebookCell] = cells[:1]
+    setup_idxs: List[int] = []
+    section_idxs: List[List[int]] = []
+    for cell in cells[1:]:
+        starts = []
+        if cell.cell_type == 'markdown':
+            starts = [match.start() for match in _SECTION_HEADING_PATTERN.finditer(cell.source)]
+        bounds = sorted({0, *starts}) + [len(cell.source)]
+        for start, end in zip(bounds, bounds[1:]):
+            if start in starts:
+                section_idxs.append([])
+            piece = cell if len(bounds) == 2 else cell._replace(source=cell.source[start:end].rstrip('\n'))
+            if piece is not cell and not piece.source.strip():
+                continue
+            (section_idxs[-1] if section_idxs else setup_idxs).append(len(split_cells))
+            split_cells.append(piece)
+    return split_cells, setup_idxs, section_idxs
+
+
+def _section_file_name(number: int, heading_source: str) -> str:
+    match = _SECTION_HEADING_PATTERN.search(heading_source)
+    slug = re.sub(r'[^0-9a-z]+', '_', match.group(1).lower()).strip('_') if match else ''
+    return f'{number:02d}_{slug or "section"}.py'
+
+
+def _heading_anchor(heading: str) -> str:
+    # Jupyter's anchor is the rendered heading with spaces replaced by dashes. Compared lowercased,
+    # as links written for GitHub use its lowercase anchors
+    return re.sub(r'\s+', '-', re.sub(r'[`*]', '', heading).strip()).lower()
+
+
+def link_sections(cells: List[NotebookCell], section_idxs: List[List[int]], file_names: List[str],
+                  folder_name: str) -> List[NotebookCell]:
+    """
+    Points the links to headings in other sections, such as a table of contents in the first cell,
+    at the pages of those sections, as the sections are no longer on the same page. The first cell
+    becomes the README of the sub-gallery, which sphinx-gallery includes in the gallery index one folder up
+    """
+    pages: Dict[str, str] = {}
+    cell_pages: Dict[int, str] = {}
+    for section, file_name in zip(section_idxs, file_names):
+        page = file_name[:-len('.py')] + '.html'
+        for i in section:
+            cell_pages[i] = page
+            if cells[i].cell_type == 'markdown':
+                for heading in _ATX_HEADING_PATTERN.findall(cells[i].source):
+                    pages.setdefault(_heading_anchor(heading), page)
+
+    def link(i: int, match: Match[str]) -> str:
+        page = pages.get(match.group(1).lower())
+        if page is None or page == cell_pages.get(i):
+            return match.group()
+        return f']({folder_name}/{page})' if i == 0 else f']({page})'
+
+    return [
+        cell._replace(source=_ANCHOR_LINK_PATTERN.sub(lambda match: link(i, match), cell.source))
+        if cell.cell_type == 'markdown' else cell
+        for i, cell in enumerate(cells)
+    ]
+
+
+def _write_if_changed(path: str, content: str):
+    """
+    Leaves the file untouched if it already has this content, so that sphinx-gallery and Sphinx
+    see it as unchanged
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def convert_ipynb_to_gallery(file_path: str, out_path: Optional[str] = None, batch: bool = True,
+                             backend: str = DEFAULT_BACKEND, stored_outputs: bool = False,
+                             split_sections: Optional[bool] = None) -> bool:
+    """
+    With stored_outputs=True, the outputs saved in the notebook are rendered into the gallery
+    example after each code cell, and the example is marked so that Sphinx does not execute it.
+    This only happens if the stored outputs are current, otherwise the example is written
+    without outputs to be executed as usual.
+
+    With split_sections=True, out_path is a folder which becomes a sub-gallery: its README has the
+    first cell of the notebook, and each level two (##) section is a separate example, numbered in
+    order. The setup cells between the first cell and the first section, such as imports, are
+    prepended to every example, so that each can be executed on its own. Stored outputs are used
+    for each example whose cells are current. Only the files whose contents changed are written.
+    Default split_sections is from the notebook metadata, see splits_sections.
+
+    Returns whether stored outputs were used, for all the examples if split.
+    """
+    cells, metadata = read_notebook(file_path, include_outputs=stored_outputs)
+    if split_sections is None:
+        split_sections = splits_sections(metadata)
+    if out_path is None:
+        out_path = file_path.replace('.ipynb', '' if split_sections else '.py')
+
+    if cells:
+        assert cells[0].cell_type == 'markdown', \
+            'First cell has to be markdown'
+    if split_sections:
+        cells, setup_idxs, section_idxs = split_notebook_sections(cells)
+        if not section_idxs:
+            # No sections, so the whole notebook is one example
+            setup_idxs, section_idxs = [], [list(range(len(cells)))]
+        file_names = [
+            _section_file_name(number, cells[section[0]].source) for number, section in enumerate(section_idxs, start=1)
+        ]
+        cells = link_sections(cells, section_idxs, file_names, os.path.basename(os.path.normpath(out_path)))
+
+    md_cell_idxs = [i for i, cell in enumerate(cells) if cell.cell_type == 'markdown']
+    rst_sources = dict(zip(
+        md_cell_idxs,
+        markdown_cells_to_rst([cells[i].source for i in md_cell_idxs], batch=batch, backend=backend)
+    ))
+
+    if not split_sections:
+        use_stored_outputs = stored_outputs and stored_outputs_are_current(cells)
+        with open(out_path, 'w') as f:
+            _write_gallery_example(f, cells, rst_sources, use_stored_outputs)
+        return use_stored_outputs
+
+    os.makedirs(out_path, exist_ok=True)
+    _write_if_changed(os.path.join(out_path, 'README.rst'), rst_sources[0] if cells else '')
+    written = set()
+    all_used_stored_outputs = True
+    for section, file_name in zip(section_idxs, file_names):
+        example_idxs = section[:1] + setup_idxs + section[1:]
+        use_stored_outputs = stored_outputs and stored_outputs_are_current([cells[i] for i in example_idxs])
+        all_used_stored_outputs = all_used_stored_outputs and use_stored_outputs
+        example = io.StringIO()
+        _write_gallery_example(example, cells, rst_sources, use_stored_outputs, example_idxs)
+        _write_if_changed(os.path.join(out_path, file_name), example.getvalue())
+        written.add(file_name)
+    for file in os.listdir(out_path):
+        # Sections which were renamed or removed
+        if file.endswith('.py') and file not in written:
+            os.remove(os.path.join(out_path, file))
+
+    return stored_outputs and all_used_stored_outputs
+
+
+def gallery_filename_pattern(examples_dir: str) -> str:
+    """
+    Pattern for sphinx-gallery's filename_pattern which matches every example in examples_dir
+    except those rendered from stored outputs, so that only those are executed
+    """
+    stored_output_files = []
+    for path, folders, files in os.walk(examples_dir):
+        folders.sort()
+        for file in sorted(files):
+            if not file.endswith('.py'):
+                continue
+            file_path = os.path.join(path, file)
+            with open(file_path) as f:
+                if any(line.rstrip('\n') == STORED_OUTPUTS_MARKER for line in f):
+                    # Relative path, as the sections of split notebooks may have the same file names
+                    parts = os.path.relpath(file_path, examples_dir).split(os.path.sep)
+                    stored_output_files.append(r'[\\/]'.join(re.escape(part) for part in parts))
+    if not stored_output_files:
+        return '/'
+    names = '|'.join(stored_output_files)
+    return rf'^(?!.*[\\/](?:{names})$)'
+
+
+def manifest_path_for_out_folder(out_folder: str) -> str:
+    return os.path.normpath(out_folder) + '.manifest.json'
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except ValueError:
+        print(f'Ignoring unreadable manifest {manifest_path}')
+        return {}
+    return manifest.get('notebooks', {})
+
+
+def save_manifest(manifest_path: str, notebooks: Dict[str, Dict[str, Any]]):
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({'notebooks': notebooks}, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def notebook_hash(file_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class NotebookConversionError(Exception):
+    pass
+
+
+def _convert_or_format_error(file_path: str, out_path: str, split_sections: bool,
+                             **convert_kwargs) -> Tuple[bool, Optional[str]]:
+    """
+    Returns whether stored outputs were used and the formatted error if the conversion failed
+    """
+    try:
+        return convert_ipynb_to_gallery(file_path, out_path, split_sections=split_sections, **convert_kwargs), None
+    except Exception:
+        return False, traceback.format_exc()
+
+
+def convert_all_in_folder_to_gallery(folder: str, out_folder: Optional[str] = None, replace: bool = False,
+                                     batch: bool = True, incremental: bool = False, jobs: int = 1,
+                                     backend: str = DEFAULT_BACKEND, stored_outputs: bool = False):
+    """
+    With incremental=True, a manifest stored next to out_folder records the content hash of each notebook
+    and the converter version. Only new or changed notebooks are converted, and outputs of notebooks which
+    no longer exist are removed.
+
+    With jobs > 1, notebooks are converted on a process pool of that size (jobs=0 uses all CPUs). Output
+    and log order are the same regardless of jobs. Failures do not stop the other conversions, they are
+    collected and raised together as a NotebookConversionError at the end.
+
+    Notebooks with split_sections in their metadata are converted to a folder with an example per
+    section, see convert_ipynb_to_gallery for this and stored_outputs.
+    """
     folder = os.path.normpath(folder)
 
     if out_folder is None:
@@ -52,25 +716,160 @@ def convert_all_in_folder_to_gallery(folder: str, out_folder: Optional[str] = No
     else:
         out_folder = os.path.normpath(out_folder)
 
+    manifest_path = manifest_path_for_out_folder(out_folder)
+    old_manifest = load_manifest(manifest_path) if incremental else {}
+    new_manifest: Dict[str, Dict[str, Any]] = {}
+    seen_outputs: Set[str] = set()
+    # (notebook file name, notebook path, output path, manifest key, whether split into sections)
+    to_convert: List[Tuple[str, str, str, str, bool]] = []
+    # Messages are printed after conversions start, with None as the placeholder for the next conversion result
+    log: List[Optional[str]] = []
+    # Formatted errors by notebook path, of notebooks which could not be read or converted
+    errors: Dict[str, str] = {}
+
     for path, folders, files in os.walk(folder):
+        folders.sort()  # walk sub-folders in a deterministic order
         if '.ipynb_checkpoints' in path:
             # Skip checkpoints folders
             continue
         sub_path = os.path.sep.join(path.split(os.path.sep)[1:])  # relative path within folder
         current_out_folder = os.path.join(out_folder, sub_path)
-        print(f'Outputting contents of {sub_path} to {current_out_folder}')
+        log.append(f'Outputting contents of {sub_path} to {current_out_folder}')
         if not os.path.exists(current_out_folder):
             os.makedirs(current_out_folder)
-        files = [file for file in files if file.lower().endswith('ipynb')]
+        files = sorted(file for file in files if file.lower().endswith('ipynb'))
         for file in files:
             file_path = os.path.join(path, file)
-            out_file = file.lower().replace('.ipynb', '.py').replace(' ', '_')
+            key = os.path.relpath(file_path, folder).replace(os.path.sep, '/')
+            file_hash = notebook_hash(file_path) if incremental else None
+            old_entry = old_manifest.get(key, {})
+            if file_hash is not None and old_entry.get('hash') == file_hash and 'split_sections' in old_entry:
+                # Unchanged since it was last converted, so its metadata is too
+                split_sections = old_entry['split_sections']
+            else:
+                try:
+                    split_sections = splits_sections(read_notebook_metadata(file_path))
+                except Exception:
+                    log.append(f'Failed to read file {file}')
+                    errors[file_path] = traceback.format_exc()
+                    if old_entry:
+                        # Keep its last output, as for notebooks which fail to convert
+                        seen_outputs.add(old_entry['output'])
+                    continue
+            # Split notebooks are converted to a folder of examples
+            out_file = file.lower().replace('.ipynb', '' if split_sections else '.py').replace(' ', '_')
             out_path = os.path.join(current_out_folder, out_file)
-            if not replace and os.path.exists(out_path):
-                print(f'Skipping file {file} as .py already exists')
+            if incremental:
+                entry: Dict[str, Any] = {
+                    'hash': file_hash,
+                    'converter_version': CONVERTER_VERSION,
+                    'backend': backend,
+                    'stored_outputs': stored_outputs,
+                    'split_sections': split_sections,
+                    'output': os.path.relpath(out_path, out_folder).replace(os.path.sep, '/'),
+                }
+                seen_outputs.add(entry['output'])
+                new_manifest[key] = entry
+                if not replace and old_manifest.get(key) == entry and os.path.exists(out_path):
+                    log.append(f'Skipping file {file} as it is unchanged since last conversion')
+                    continue
+            elif not replace and os.path.exists(out_path):
+                log.append(f'Skipping file {file} as .py already exists')
+                continue
+            to_convert.append((file, file_path, out_path, key, split_sections))
+            log.append(None)
+
+    convert = partial(_convert_or_format_error, batch=batch, backend=backend, stored_outputs=stored_outputs)
+    file_paths = [file_path for _, file_path, _, _, _ in to_convert]
+    out_paths = [out_path for _, _, out_path, _, _ in to_convert]
+    splits = [split_sections for _, _, _, _, split_sections in to_convert]
+    if jobs == 1 or len(to_convert) <= 1:
+        results: Iterable[Tuple[bool, Optional[str]]] = map(convert, file_paths, out_paths, splits)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs or None)
+        results = executor.map(convert, file_paths, out_paths, splits)
+
+    num_unreadable = len(errors)
+    try:
+        tasks_and_results = zip(to_convert, results)
+        for message in log:
+            if message is not None:
+                print(message)
                 continue
+            (file, file_path, out_path, key, split_sections), (used_stored_outputs, error) = next(tasks_and_results)
             print(f'Converting file {file}')
-            convert_ipynb_to_gallery(file_path, out_path)
+            if stored_outputs and error is None and not used_stored_outputs:
+                if split_sections:
+                    print(f'Stored outputs of some sections of {file} are missing or stale, they will be executed')
+                else:
+                    print(f'Stored outputs of {file} are missing or stale, it will be executed')
+            if error is not None:
+                print(f'Failed to convert file {file}')
+                errors[file_path] = error
+                # Don't record the notebook as converted, so that it is retried next time
+                new_manifest.pop(key, None)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if incremental:
+        for key, entry in old_manifest.items():
+            # Also removes the old output of a notebook which is now converted to a different path,
+            # as when it starts or stops being split into sections
+            if entry['output'] in seen_outputs:
+                continue
+            stale_path = os.path.join(out_folder, *entry['output'].split('/'))
+            if os.path.isdir(stale_path):
+                print(f'Removing {stale_path} as it is no longer the output of {key}')
+                shutil.rmtree(stale_path)
+            elif os.path.exists(stale_path):
+                print(f'Removing {stale_path} as it is no longer the output of {key}')
+                os.remove(stale_path)
+        save_manifest(manifest_path, new_manifest)
+
+    if errors:
+        report = '\n\n'.join(f'{file_path}:\n{error}' for file_path, error in errors.items())
+        raise NotebookConversionError(
+            f'Failed to convert {len(errors)} of {len(to_convert) + num_unreadable} notebooks:\n\n{report}'
+        )
+
+
+def compare_backends(folder: str, backends: Optional[List[str]] = None) -> int:
+    """
+    Conformance check which converts every markdown cell of the notebooks in folder with each of
+    the backends, printing a diff wherever a backend's output differs from the first backend's.
+    Returns the number of cells with differences.
+    """
+    if backends is None:
+        backends = list(BACKENDS)
+    converters = [get_backend(backend) for backend in backends]
+    num_differences = 0
+    num_cells = 0
+    for path, folders, files in os.walk(os.path.normpath(folder)):
+        folders.sort()
+        if '.ipynb_checkpoints' in path:
+            continue
+        for file in sorted(file for file in files if file.lower().endswith('ipynb')):
+            file_path = os.path.join(path, file)
+            cells = list(iter_notebook_cells(file_path))
+            md_cell_idxs = [i for i, cell in enumerate(cells) if cell.cell_type == 'markdown']
+            md_sources = [cells[i].source for i in md_cell_idxs]
+            num_cells += len(md_sources)
+            expected, *others = [converter.convert_cells(md_sources) for converter in converters]
+            for backend, rst_sources in zip(backends[1:], others):
+                for cell_idx, expected_rst, rst_source in zip(md_cell_idxs, expected, rst_sources):
+                    if rst_source == expected_rst:
+                        continue
+                    num_differences += 1
+                    print(''.join(difflib.unified_diff(
+                        expected_rst.splitlines(keepends=True),
+                        rst_source.splitlines(keepends=True),
+                        fromfile=f'{file_path} cell {cell_idx} ({backends[0]})',
+                        tofile=f'{file_path} cell {cell_idx} ({backend})',
+                    )))
+    print(f'{num_differences} differences between backends {", ".join(backends)} in {num_cells} markdown cells')
+    return num_differences
 
 
 if __name__ == '__main__':
@@ -82,5 +881,30 @@ if __name__ == '__main__':
                         help='Output folder for Sphinx Gallery py files, default in same folder')
     parser.add_argument('-r', '--replace', action='store_true',
                         help='Overwrite existing Sphinx Gallery py files')
+    parser.add_argument('--no-batch', dest='batch', action='store_false',
+                        help='Call pandoc once per markdown cell rather than once per notebook')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Only convert notebooks which changed since the last conversion, tracked in a manifest '
+                             'next to the output folder, and remove outputs of deleted notebooks')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of notebooks to convert in parallel, 0 to use all CPUs')
+    parser.add_argument('-b', '--backend', default=DEFAULT_BACKEND, choices=list(BACKENDS),
+                        help='Markdown to rst converter. python runs in-process without pandoc '
+                             'but only supports the markdown used in the examples')
+    parser.add_argument('--compare-backends', action='store_true',
+                        help='Instead of converting, check that all backends give the same rst for every '
+                             'markdown cell in the folder, exiting with an error if not')
+    parser.add_argument('-s', '--stored-outputs', action='store_true',
+                        help='Render the outputs saved in the notebooks into the examples so that they do not need '
+                             'to be executed. Notebooks with missing or stale outputs are still executed')
     args = parser.parse_args()
-    convert_all_in_folder_to_gallery(args.folder, args.out_folder, args.replace)
+    if args.compare_backends:
+        sys.exit(1 if compare_backends(args.folder) else 0)
+    try:
+        convert_all_in_folder_to_gallery(
+            args.folder, args.out_folder, args.replace, batch=args.batch, incremental=args.incremental,
+            jobs=args.jobs, backend=args.backend, stored_outputs=args.stored_outputs
+        )
+    except NotebookConversionError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
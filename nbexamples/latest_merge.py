@@ -0,0 +1,130 @@
+"""Merge the latest available data for each key onto a panel with a sorted as-of merge.
+Used in Additional Research Tools and benchmarked in benchmarks/asof_merge.py.
+
+pd_utils.left_merge_latest merges every row of the right DataFrame with the same key onto each row of
+the left one, then keeps the latest date not after the left date. That is rows of the left times dates
+per key of the right in memory, e.g. every past quarter of fundamentals for every firm-day.
+left_merge_latest here takes the same arguments and gives the same result with pd.merge_asof, which
+sorts both DataFrames by date once and walks through them together, keeping only the latest
+matching row of each key.
+
+Like pd_utils, rows of the left missing a key or the date, and rows of the right missing a key or the
+date, get no match. max_offset can be a timedelta or an int, passed to merge_asof as its tolerance, or
+a DateOffset such as pd_utils.tradedays() * 20, which is checked after the merge for each distinct date.
+"""
+import datetime
+import warnings
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from pandas.errors import PerformanceWarning
+from pandas.tseries.offsets import BaseOffset, Tick
+
+Columns = Union[str, Sequence[str]]
+
+MaxOffset = Union[int, datetime.timedelta, BaseOffset]
+
+
+def _as_list(columns: Columns) -> List[str]:
+    if isinstance(columns, str):
+        return [columns]
+    return list(columns)
+
+
+def _key_codes(left: pd.Series, right: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The same integer for the same value in left and right, -1 for missing values
+    """
+    codes, _ = pd.factorize(np.concatenate([left.to_numpy(), right.to_numpy()]))
+    return codes[:len(left)], codes[len(left):]
+
+
+def _earliest_dates(dates: pd.Series, max_offset: BaseOffset) -> pd.Series:
+    """
+    Each date minus max_offset. Offsets such as trading days are applied one date at a time,
+    so subtract them from each distinct date only
+    """
+    unique_dates = pd.DatetimeIndex(dates.unique())
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', PerformanceWarning)
+        earliest = pd.Series(unique_dates - max_offset, index=unique_dates)
+    return dates.map(earliest)
+
+
+def latest_rows(df: pd.DataFrame, df2: pd.DataFrame, on: Columns, left_datevar: str = 'Date',
+                right_datevar: str = 'Date', max_offset: Optional[MaxOffset] = None) -> np.ndarray:
+    """
+    Position in df2 of the row with the latest right_datevar not after left_datevar and the same on
+    values, for each row of df, or -1 where there is none
+
+    :param on: names of columns on which to match, excluding date
+    :param max_offset: maximum amount of time to go back to look for a match, as in left_merge_latest
+    """
+    on = _as_list(on)
+    # merge_asof matches integer keys much faster than strings, so match on codes for the keys
+    by = [f'_by_{i}' for i in range(len(on))]
+    left = pd.DataFrame({'_left_date': df[left_datevar].to_numpy(), '_left_row': np.arange(len(df))})
+    right = pd.DataFrame({'_right_date': df2[right_datevar].to_numpy(), '_right_row': np.arange(len(df2))})
+    for col, by_col in zip(on, by):
+        left[by_col], right[by_col] = _key_codes(df[col], df2[col])
+    left = left.loc[left['_left_date'].notna() & (left[by] >= 0).all(axis=1)]
+    right = right.loc[right['_right_date'].notna() & (right[by] >= 0).all(axis=1)]
+
+    # Within a date, rows stay in their original order, so the last row of df2 for a key and date is used
+    tolerance = max_offset if isinstance(max_offset, (int, np.integer, datetime.timedelta, Tick)) else None
+    merged = pd.merge_asof(
+        left.sort_values('_left_date', kind='mergesort'),
+        right.sort_values('_right_date', kind='mergesort'),
+        left_on='_left_date',
+        right_on='_right_date',
+        by=by,
+        tolerance=pd.Timedelta(tolerance) if isinstance(tolerance, (datetime.timedelta, Tick)) else tolerance,
+        direction='backward',
+    )
+    positions = np.full(len(df), -1, dtype=np.intp)
+    if merged.empty:
+        # No rows of df can match, and with no dates the offset can't be subtracted
+        return positions
+    found = merged['_right_row'].notna()
+    if max_offset is not None and tolerance is None:
+        # The latest date is too old only if every earlier date is too
+        found &= merged['_right_date'] >= _earliest_dates(merged['_left_date'], max_offset)
+
+    positions[merged.loc[found, '_left_row'].to_numpy()] = merged.loc[found, '_right_row'].to_numpy(dtype=np.intp)
+    return positions
+
+
+def left_merge_latest(df: pd.DataFrame, df2: pd.DataFrame, on: Columns, left_datevar: str = 'Date',
+                      right_datevar: str = 'Date', max_offset: Optional[MaxOffset] = None) -> pd.DataFrame:
+    """
+    Left merges df2 to df using on, but grabbing the most recent observation (right_datevar will be
+    the soonest earlier than or equal to left_datevar), the same as pd_utils.left_merge_latest.
+
+    Gives one row for each row of df, in the order of df. Where df2 has several rows for the same key
+    and latest date, pd_utils gives a row for each and this gives the last of them
+
+    :param on: names of columns on which to match, excluding date
+    :param max_offset: maximum amount of time to go back to look for a match. When the dates are
+        datetimes, pass a timedelta or an offset such as pd_utils.tradedays() * 20. When they are ints
+        (e.g. year), pass an int. Int dates stay numbers in the result, where pd_utils turns them into datetimes
+    :return: columns of df, then right_datevar (with _y added when the same as left_datevar) and the
+        other columns of df2, with _x and _y added to other columns in both
+    """
+    on = _as_list(on)
+    positions = latest_rows(df, df2, on, left_datevar=left_datevar, right_datevar=right_datevar,
+                            max_offset=max_offset)
+
+    right_date_name = right_datevar + '_y' if right_datevar == left_datevar else right_datevar
+    right_columns = [right_datevar] + [col for col in df2.columns if col not in on + [right_datevar]]
+    right_names = [right_date_name] + right_columns[1:]
+    overlapping = set(df.columns) & set(right_columns[1:])
+
+    left = df.reset_index(drop=True)
+    left.columns = [f'{col}_x' if col in overlapping else col for col in left.columns]
+    right = pd.DataFrame({
+        f'{name}_y' if col in overlapping else name: take(df2[col].to_numpy(), positions, allow_fill=True)
+        for col, name in zip(right_columns, right_names)
+    })
+    return pd.concat([left, right], axis=1)
@@ -0,0 +1,194 @@
+"""Build pyexlatex documents and presentations incrementally in a build folder.
+Used in Additional Research Tools.
+
+Displaying pl.Document(content) saves every figure, builds every table and runs LaTeX again, even if only
+one sentence changed. With a LatexBuild, each step is keyed by a hash of its inputs and skipped when
+the key is unchanged:
+
+- figure_source calls the plotting function and saves the figure only when the function's code or
+  arguments changed, otherwise it returns the file saved before. The path does not change, so the
+  LaTeX referencing it does not either
+- table builds a pl.Table only when its DataFrames or options changed, otherwise it loads the
+  table from a ResultCache in the build folder
+- pdf writes the .tex file only when it differs from the one on disk, and runs LaTeX only when the
+  LaTeX or the figure files it includes changed, otherwise it returns the PDF built before
+
+So after a small edit, only the changed figure or table and the final LaTeX run are redone.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Any, Callable, Dict, Optional
+
+import pyexlatex as pl
+from pyexlatex.logic.pdf.main import latex_str_to_pdf_obj_with_sources
+from pyexlatex.models.document import DocumentBase
+from pyexlatex.texgen.replacements.filename import latex_filename_replacements
+
+from result_cache import ResultCache, call_key
+
+KEY_SUFFIX = '.key'
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    folder = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class BuiltPDF:
+    """
+    PDF file in the build folder, displayed inline in Jupyter like a pl.Document
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f'<BuiltPDF({self.path})>'
+
+    def _repr_pdf_(self) -> bytes:
+        # Raises FileNotFoundError if the PDF was deleted since it was built, rather than displaying nothing
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class LatexBuild:
+    """
+    Folder of built figures, tables, .tex files and PDFs, each rebuilt only when its inputs change
+
+    >>> build = LatexBuild('latex-build')
+    >>> path = build.figure_source('My Subfigure', plot_returns, df)
+    >>> table = build.table([[df]], caption='My Table')
+    >>> build.pdf(pl.Document([table, pl.Figure.from_dict_of_names_and_filepaths({'My Subfigure': path})]), 'paper')
+
+    :param folder: created if it does not exist
+    """
+
+    def __init__(self, folder: str = 'latex-build'):
+        self.folder = folder
+        self.sources_folder = os.path.join(folder, 'Sources')
+        os.makedirs(self.sources_folder, exist_ok=True)
+        self.cache = ResultCache(os.path.join(folder, 'cache'))
+        # Number of times each step was run or skipped, e.g. {'figure saved': 1, 'figure reused': 2}
+        self.counts: Dict[str, int] = {}
+
+    def _count(self, step: str) -> None:
+        self.counts[step] = self.counts.get(step, 0) + 1
+
+    def _is_current(self, path: str, key: str) -> bool:
+        return os.path.exists(path) and _read(path + KEY_SUFFIX) == key.encode()
+
+    def _mark_current(self, path: str, key: str) -> None:
+        _write_atomic(path + KEY_SUFFIX, key.encode())
+
+    def figure_source(self, name: str, plot_func: Callable, *args, source_filetype: str = 'pdf', **kwargs) -> str:
+        """
+        Path of the figure made by plot_func(*args, **kwargs), saved to the Sources folder under name.
+        Pass the path to pl.Figure.from_dict_of_names_and_filepaths
+
+        :param plot_func: returns a matplotlib Figure or Axes. Keyed with call_key, so only its own code
+            and arguments are part of the key, not data it reads from elsewhere
+        :param source_filetype: use png or another image type for complicated figures
+        """
+        import matplotlib.pyplot as plt
+
+        path = os.path.join(self.sources_folder, f'{latex_filename_replacements(name)}.{source_filetype}')
+        key = call_key(plot_func, *args, **kwargs)
+        if self._is_current(path, key):
+            self._count('figure reused')
+            return path
+
+        figure = plot_func(*args, **kwargs)
+        figure = figure.get_figure() if hasattr(figure, 'get_figure') else figure
+        fd, temp_path = tempfile.mkstemp(dir=self.sources_folder, suffix=f'.{source_filetype}')
+        os.close(fd)
+        try:
+            figure.savefig(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        finally:
+            plt.close(figure)
+        self._mark_current(path, key)
+        self._count('figure saved')
+        return path
+
+    def table(self, *args, **kwargs) -> Any:
+        """
+        pl.Table.from_list_of_lists_of_dfs(*args, **kwargs), loaded from the cache if built before
+        with the same DataFrames and options
+        """
+        found_before = self.cache.hits
+        table = self.cache(pl.Table.from_list_of_lists_of_dfs)(*args, **kwargs)
+        self._count('table reused' if self.cache.hits > found_before else 'table built')
+        return table
+
+    def write_tex(self, document: DocumentBase, name: str) -> str:
+        """
+        Write the LaTeX of document to name.tex, only if it differs from the file already there,
+        so that the modified time of the file only changes with its contents
+
+        :return: the LaTeX
+        """
+        tex = str(document)
+        path = os.path.join(self.folder, f'{name}.tex')
+        data = tex.encode('utf8')
+        if _read(path) == data:
+            self._count('tex unchanged')
+        else:
+            _write_atomic(path, data)
+            self._count('tex written')
+        return tex
+
+    def pdf(self, document: DocumentBase, name: str = 'document') -> BuiltPDF:
+        """
+        Build document to name.pdf in the build folder, skipping LaTeX if its LaTeX and the
+        figures it includes are the same as when the PDF was last built
+
+        :param document: pl.Document or pl.Presentation
+        """
+        tex = self.write_tex(document, name)
+        path = os.path.join(self.folder, f'{name}.pdf')
+        image_paths = document.data.filepaths
+        image_binaries = document.data.binaries
+
+        hasher = hashlib.blake2b(tex.encode('utf8'), digest_size=20)
+        hasher.update(repr((document.has_references, image_paths)).encode())
+        if image_binaries:
+            for binary in image_binaries:
+                hasher.update(binary)
+        else:
+            for image_path in image_paths or []:
+                hasher.update(_read(image_path) or b'')
+        key = hasher.hexdigest()
+
+        if self._is_current(path, key):
+            self._count('pdf reused')
+            return BuiltPDF(path)
+
+        pdf_bytes = latex_str_to_pdf_obj_with_sources(
+            tex,
+            image_paths=image_paths,
+            image_binaries=image_binaries,
+            run_bibtex=document.has_references
+        ).readb()
+        _write_atomic(path, pdf_bytes)
+        self._mark_current(path, key)
+        self._count('pdf built')
+        return BuiltPDF(path)
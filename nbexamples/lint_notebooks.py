@@ -0,0 +1,346 @@
+"""Check the code cells of jupyter notebooks for patterns which are slow on large data.
+Usage: python lint_notebooks.py <folder or notebook.ipynb> [--ignore PERF001,PERF002]
+Reads the same cell sources as ipynb_to_gallery.py and reports every finding with its notebook,
+cell index (counting all cells, as in profile_notebooks.py) and line. Exits with an error if
+there are any findings.
+
+Checks:
+PERF001: .apply, .applymap or .map with a Python function, which is called for every value or row
+PERF002: DataFrame.append, which copies the whole DataFrame every time (removed in pandas 2)
+PERF003: building a DataFrame from a list comprehension, which creates a Python object for every row
+PERF004: .iterrows, which creates a Series for every row
+PERF005: pl.Document rebuilt from content already used for a Document and not changed since, or built in a loop
+
+Suppress findings on a line by ending it with ``# perf: ignore`` or ``# perf: ignore[PERF001,PERF004]``,
+or for a whole cell with a line starting with ``# perf: ignore-cell``.
+"""
+import ast
+import os
+import re
+import sys
+from typing import Optional, List, Iterable, Iterator, NamedTuple, Set, Dict, Union
+
+from ipynb_to_gallery import iter_notebook_cells
+
+CHECKS = {
+    'PERF001': 'calls a Python function for every value or row, use vectorized operations instead',
+    'PERF002': 'DataFrame.append copies the whole DataFrame every time, collect the pieces and pd.concat once',
+    'PERF003': 'builds a DataFrame from a Python object for every row, build the columns with numpy instead',
+    'PERF004': '.iterrows creates a Series for every row, use vectorized operations or .itertuples instead',
+    'PERF005': 'pl.Document is rebuilt and re-rendered, build the content first and create the Document once',
+}
+
+_SUPPRESS_PATTERN = re.compile(r'#\s*perf:\s*ignore(?:\[([A-Z0-9,\s]*)\])?(?!-)')
+_SUPPRESS_CELL_PATTERN = re.compile(r'^\s*#\s*perf:\s*ignore-cell\b', re.MULTILINE)
+_MAGIC_PATTERN = re.compile(r'^(\s*)[%!]', re.MULTILINE)
+
+_APPLY_METHODS = {'apply', 'applymap'}
+_PANDAS_MODULES = {'pandas'}
+_PYEXLATEX_MODULES = {'pyexlatex'}
+_DATAFRAME_CONSTRUCTORS = {'DataFrame'}
+_DATAFRAME_CLASS_CONSTRUCTORS = {'from_records'}
+_MUTATING_METHODS = {'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse'}
+
+
+class Finding(NamedTuple):
+    notebook: str
+    cell: int
+    line: int
+    code: str
+    message: str
+
+    def __str__(self):
+        return f'{self.notebook}: cell {self.cell}, line {self.line}: {self.code} {self.message}'
+
+
+class _NotebookState:
+    """
+    What is known about the names in the notebook's namespace, carried from cell to cell
+    """
+
+    def __init__(self) -> None:
+        self.pandas_names: Set[str] = set()
+        # DataFrame imported directly from pandas
+        self.dataframe_names: Set[str] = set()
+        # Names of pyexlatex modules and of Document imported directly
+        self.pyexlatex_names: Set[str] = set()
+        self.document_names: Set[str] = set()
+        self.functions: Set[str] = set()
+        self.lists: Set[str] = set()
+        self.list_comprehensions: Set[str] = set()
+        self.dataframes: Set[str] = set()
+        # Content already used for a Document, by the name it is in if any, so it is forgotten when that changes
+        self.document_arguments: Dict[str, Optional[str]] = {}
+
+    def reassigned(self, name: str):
+        for names in (self.lists, self.list_comprehensions, self.dataframes):
+            names.discard(name)
+        self.modified(name)
+
+    def modified(self, name: str):
+        self.document_arguments = {
+            arguments: root for arguments, root in self.document_arguments.items() if root != name
+        }
+
+
+def _root_name(node: ast.AST) -> Optional[str]:
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Call)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+class _CellChecker(ast.NodeVisitor):
+
+    def __init__(self, state: _NotebookState) -> None:
+        self.state = state
+        self.findings: List[ast.Call] = []
+        self.codes: List[str] = []
+        self._loop_depth = 0
+
+    def _add(self, node: ast.Call, code: str):
+        self.findings.append(node)
+        self.codes.append(code)
+
+    # Imports and definitions
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            name = alias.asname or alias.name.split('.')[0]
+            if alias.name in _PANDAS_MODULES:
+                self.state.pandas_names.add(name)
+            elif alias.name in _PYEXLATEX_MODULES:
+                self.state.pyexlatex_names.add(name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        for alias in node.names:
+            name = alias.asname or alias.name
+            if node.module in _PANDAS_MODULES and alias.name in _DATAFRAME_CONSTRUCTORS:
+                self.state.dataframe_names.add(name)
+            elif node.module in _PYEXLATEX_MODULES and alias.name == 'Document':
+                self.state.document_names.add(name)
+
+    def _visit_function(self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef]):
+        self.state.functions.add(node.name)
+        # The body runs later, possibly in a loop, but is only checked once
+        loop_depth, self._loop_depth = self._loop_depth, 0
+        self.generic_visit(node)
+        self._loop_depth = loop_depth
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self._visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self._visit_function(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        self.visit(node.value)
+        for target in node.targets:
+            self.visit(target)
+            if isinstance(target, ast.Name):
+                self._track_assignment(target.id, node.value)
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        self.generic_visit(node)
+        if isinstance(node.target, ast.Name):
+            self.state.modified(node.target.id)
+
+    def _track_assignment(self, name: str, value: ast.AST):
+        # Checked before forgetting the name, as in df = df.copy()
+        is_dataframe = self._is_dataframe(value)
+        self.state.reassigned(name)
+        if isinstance(value, (ast.List, ast.ListComp)) or (
+                isinstance(value, ast.Call) and isinstance(value.func, ast.Name) and value.func.id == 'list'):
+            self.state.lists.add(name)
+        if isinstance(value, ast.ListComp):
+            self.state.list_comprehensions.add(name)
+        elif is_dataframe:
+            self.state.dataframes.add(name)
+
+    def _is_dataframe(self, node: ast.AST) -> bool:
+        """
+        Whether the expression is likely a DataFrame: created by pandas or derived from a known DataFrame
+        """
+        if isinstance(node, ast.Name):
+            return node.id in self.state.dataframes or node.id.endswith('df')
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            root = _root_name(node.func)
+            return root in self.state.pandas_names or root in self.state.dataframes
+        return False
+
+    # Loops
+
+    def _visit_loop(self, node: ast.AST):
+        self._loop_depth += 1
+        self.generic_visit(node)
+        self._loop_depth -= 1
+
+    visit_For = _visit_loop
+    visit_AsyncFor = _visit_loop
+    visit_While = _visit_loop
+    visit_ListComp = _visit_loop
+    visit_SetComp = _visit_loop
+    visit_DictComp = _visit_loop
+    visit_GeneratorExp = _visit_loop
+
+    # Calls
+
+    def visit_Call(self, node: ast.Call):
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in _MUTATING_METHODS and isinstance(func.value, ast.Name):
+            # Checked first, as appending to a list of content also changes what a Document would get
+            self.state.modified(func.value.id)
+        if isinstance(func, ast.Attribute):
+            if func.attr in _APPLY_METHODS and self._is_python_function(node, any_name=True):
+                self._add(node, 'PERF001')
+            elif func.attr == 'map' and self._is_python_function(node, any_name=False):
+                self._add(node, 'PERF001')
+            elif func.attr == 'append' and self._is_dataframe_append(node):
+                self._add(node, 'PERF002')
+            elif func.attr == 'iterrows':
+                self._add(node, 'PERF004')
+            elif func.attr in _DATAFRAME_CONSTRUCTORS and _root_name(func) in self.state.pandas_names:
+                self._check_dataframe_data(node)
+            elif func.attr in _DATAFRAME_CLASS_CONSTRUCTORS and isinstance(func.value, ast.Attribute) and \
+                    func.value.attr in _DATAFRAME_CONSTRUCTORS and _root_name(func) in self.state.pandas_names:
+                self._check_dataframe_data(node)
+            elif func.attr == 'Document' and _root_name(func) in self.state.pyexlatex_names:
+                self._check_document(node)
+        elif isinstance(func, ast.Name):
+            if func.id in self.state.dataframe_names:
+                self._check_dataframe_data(node)
+            elif func.id in self.state.document_names:
+                self._check_document(node)
+
+    def _is_python_function(self, node: ast.Call, any_name: bool) -> bool:
+        """
+        Whether the first argument is a Python function rather than the name of a built-in method
+        such as 'mean', a numpy function, or (for map) a mapping
+
+        :param any_name: treat any variable as a function, otherwise only functions defined in the notebook
+        """
+        arg = node.args[0] if node.args else next(
+            (keyword.value for keyword in node.keywords if keyword.arg in ('func', 'arg')), None
+        )
+        if isinstance(arg, ast.Lambda):
+            return True
+        if isinstance(arg, ast.Name):
+            return any_name or arg.id in self.state.functions
+        return False
+
+    def _is_dataframe_append(self, node: ast.Call) -> bool:
+        receiver = node.func.value  # type: ignore
+        if isinstance(receiver, ast.Name) and receiver.id in self.state.lists:
+            return False
+        return self._is_dataframe(receiver)
+
+    def _check_dataframe_data(self, node: ast.Call):
+        data = node.args[0] if node.args else next(
+            (keyword.value for keyword in node.keywords if keyword.arg in ('data', 'records')), None
+        )
+        if isinstance(data, (ast.ListComp, ast.GeneratorExp)) or (
+                isinstance(data, ast.Name) and data.id in self.state.list_comprehensions):
+            self._add(node, 'PERF003')
+
+    def _check_document(self, node: ast.Call):
+        arguments = ast.dump(ast.Tuple(elts=node.args[:1], ctx=ast.Load()))
+        if self._loop_depth or (node.args and arguments in self.state.document_arguments):
+            self._add(node, 'PERF005')
+        if node.args:
+            self.state.document_arguments[arguments] = _root_name(node.args[0])
+
+
+def _suppressed_codes(line: str) -> Optional[Set[str]]:
+    """
+    :return: None if nothing is suppressed on the line, an empty set if everything is
+    """
+    match = _SUPPRESS_PATTERN.search(line)
+    if match is None:
+        return None
+    if match.group(1) is None:
+        return set()
+    return {code.strip() for code in match.group(1).split(',') if code.strip()}
+
+
+def _is_suppressed(lines: List[str], node: ast.Call, code: str) -> bool:
+    first_line = node.lineno
+    # Python 3.7 has no end_lineno, there the last line of the call is the last line any part of it starts on
+    last_line = getattr(node, 'end_lineno', None) or max(
+        getattr(child, 'lineno', first_line) for child in ast.walk(node)
+    )
+    for line in lines[first_line - 1:last_line]:
+        codes = _suppressed_codes(line)
+        if codes is not None and (not codes or code in codes):
+            return True
+    return False
+
+
+def _strip_magics(source: str) -> str:
+    # Comment out IPython magics and shell commands so the cell parses, keeping line numbers the same
+    return _MAGIC_PATTERN.sub(r'\1#', source)
+
+
+def lint_notebook(file_path: str, ignore: Iterable[str] = ()) -> Iterator[Finding]:
+    ignore = set(ignore)
+    state = _NotebookState()
+    name = os.path.basename(file_path)
+    for index, cell in enumerate(iter_notebook_cells(file_path)):
+        if cell.cell_type != 'code' or not cell.source.strip() or cell.source.lstrip().startswith('%%'):
+            continue
+        try:
+            tree = ast.parse(_strip_magics(cell.source))
+        except SyntaxError as e:
+            print(f'Could not parse cell {index} of {file_path}, skipping it: {e}', file=sys.stderr)
+            continue
+        checker = _CellChecker(state)
+        checker.visit(tree)
+        if _SUPPRESS_CELL_PATTERN.search(cell.source):
+            continue
+        lines = cell.source.splitlines()
+        for node, code in zip(checker.findings, checker.codes):
+            if code in ignore or _is_suppressed(lines, node, code):
+                continue
+            yield Finding(name, index, node.lineno, code, CHECKS[code])
+
+
+def _notebooks_in(paths: Iterable[str]) -> List[str]:
+    notebooks: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            notebooks.extend(
+                os.path.join(path, file) for file in sorted(os.listdir(path)) if file.endswith('.ipynb')
+            )
+        else:
+            notebooks.append(path)
+    return notebooks
+
+
+def lint_notebooks(paths: Iterable[str], ignore: Iterable[str] = ()) -> List[Finding]:
+    findings: List[Finding] = []
+    for file_path in _notebooks_in(paths):
+        findings.extend(lint_notebook(file_path, ignore=ignore))
+    return findings
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+',
+                        help='Notebooks or folders of notebooks to check')
+    parser.add_argument('--ignore', default='',
+                        help=f'Comma-separated codes of checks to skip, from {", ".join(CHECKS)}')
+    args = parser.parse_args()
+
+    ignore_codes = {code.strip() for code in args.ignore.split(',') if code.strip()}
+    unknown_codes = ignore_codes - set(CHECKS)
+    if unknown_codes:
+        parser.error(f'unknown codes to ignore: {", ".join(sorted(unknown_codes))}')
+    all_findings = lint_notebooks(args.paths, ignore=ignore_codes)
+    for finding in all_findings:
+        print(finding)
+    if all_findings:
+        print(f'{len(all_findings)} findings', file=sys.stderr)
+        sys.exit(1)
+    print('No findings')
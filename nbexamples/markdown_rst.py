@@ -0,0 +1,584 @@
+"""Convert the Markdown used in the example notebooks to reStructuredText without pandoc.
+Covers the subset of Markdown the notebooks use and aims to produce the same output as pandoc
+for it: ATX and setext headings, paragraphs, tight and loose bullet and ordered lists (nested),
+fenced and indented code blocks, inline code, emphasis, links, autolinks, inline math, HTML
+entities, inline raw HTML such as anchors (tags are dropped, their contents kept) and pipe tables.
+Text is wrapped at 72 columns with smart quotes and dashes, as pandoc does by default.
+"""
+import html
+import re
+from typing import List, Optional, Tuple, Any
+
+WIDTH = 72
+HEADING_CHARS = '=-~^\' '
+
+# Characters which may come directly before and after inline markup without an escaped space
+_OK_BEFORE_MARKUP = set('-:/\'"<([{–—')
+_OK_AFTER_MARKUP = set('-.,:;!?\\/\'")]}>–—')
+_ESCAPABLE = set('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
+_OPENING_CONTEXT = set('([{-–—“‘')
+
+_ATX_HEADING = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+_SETEXT_UNDERLINE = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})[ \t]*([^`\s]*)')
+_LIST_ITEM = re.compile(r'^( {0,3})([-*+]|\d{1,9}[.)])( +|$)(.*)$')
+_HTML_TAG = re.compile(r'<!--.*?-->|</?[A-Za-z][A-Za-z0-9-]*(?:\s+[^<>]*)?/?>', re.DOTALL)
+_AUTOLINK = re.compile(r'<((?:https?|ftp|mailto):[^<>\s]+)>')
+_ENTITY = re.compile(r'&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);')
+_LINK_DESTINATION = re.compile(r'\(\s*<?([^\s()<>]*)>?(?:\s+(?:"[^"]*"|\'[^\']*\'))?\s*\)')
+_TABLE_SEPARATOR = re.compile(r'^ {0,3}\|?(?:[ \t]*:?-+:?[ \t]*\|)*[ \t]*:?-+:?[ \t]*\|?[ \t]*$')
+_TABLE_CELL_BREAK = re.compile(r'(?<!\\)\|')
+
+# Inline nodes are tuples of (kind, value, children) with kinds:
+# str, space, code, math, emph, strong, link (value is the url)
+Node = Tuple[str, Any, list]
+# Rendered pieces are [text, starts with markup, ends with markup], or None for a breakable space
+Piece = Optional[list]
+
+
+def markdown_to_rst(md_source: str) -> str:
+    lines = md_source.replace('\r\n', '\n').replace('\t', '    ').split('\n')
+    out_lines = _render_blocks(_parse_blocks(lines), WIDTH)
+    # Collapse runs of blank lines and drop them from the ends
+    collapsed: List[str] = []
+    for line in out_lines:
+        if line == '' and (not collapsed or collapsed[-1] == ''):
+            continue
+        collapsed.append(line)
+    while collapsed and collapsed[-1] == '':
+        collapsed.pop()
+    return '\n'.join(collapsed) + '\n'
+
+
+# Block parsing
+
+def _indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def _parse_blocks(lines: List[str], in_list_item: bool = False) -> List[tuple]:
+    blocks: List[tuple] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+
+        heading_match = _ATX_HEADING.match(line)
+        if heading_match:
+            blocks.append(('heading', len(heading_match.group(1)), heading_match.group(2) or ''))
+            i += 1
+            continue
+
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            fence = fence_match.group(1)
+            code_lines = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence):
+                code_lines.append(lines[i])
+                i += 1
+            blocks.append(('code', fence_match.group(2), code_lines))
+            i += 1
+            continue
+
+        if _LIST_ITEM.match(line):
+            block, i = _parse_list(lines, i)
+            blocks.append(block)
+            continue
+
+        if _indent_of(line) >= 4:
+            code_lines = []
+            while i < len(lines) and (_indent_of(lines[i]) >= 4 or not lines[i].strip()):
+                code_lines.append(lines[i][4:])
+                i += 1
+            while code_lines and not code_lines[-1].strip():
+                code_lines.pop()
+            blocks.append(('code', '', code_lines))
+            continue
+
+        if '|' in line and i + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[i + 1]):
+            block, i = _parse_table(lines, i)
+            blocks.append(block)
+            continue
+
+        if i + 1 < len(lines) and _SETEXT_UNDERLINE.match(lines[i + 1]):
+            level = 1 if lines[i + 1].strip().startswith('=') else 2
+            blocks.append(('heading', level, line.strip()))
+            i += 2
+            continue
+
+        # Paragraphs run until a blank line, except that a list item may start a nested list
+        para_lines = [line]
+        i += 1
+        while i < len(lines) and lines[i].strip():
+            if in_list_item and _LIST_ITEM.match(lines[i]):
+                break
+            para_lines.append(lines[i])
+            i += 1
+        blocks.append(('para', '\n'.join(para_lines).strip()))
+
+    return blocks
+
+
+def _list_type(marker: str) -> str:
+    return marker[-1] if marker[-1] in '.)' else '-'
+
+
+def _parse_list(lines: List[str], i: int) -> Tuple[tuple, int]:
+    first_match = _LIST_ITEM.match(lines[i])
+    assert first_match is not None
+    list_type = _list_type(first_match.group(2))
+    start = int(first_match.group(2)[:-1]) if list_type != '-' else 1
+    items: List[List[tuple]] = []
+    loose = False
+    while i < len(lines):
+        item_match = _LIST_ITEM.match(lines[i])
+        if item_match is None or _list_type(item_match.group(2)) != list_type:
+            break
+        indent, marker, spaces, content = item_match.groups()
+        if not 1 <= len(spaces) <= 4:
+            # Content which starts far from the marker is an indented block within the item
+            content = ' ' * (len(spaces) - 1) + content
+            spaces = ' '
+        content_col = len(indent) + len(marker) + len(spaces)
+        item_lines = [content]
+        i += 1
+        while i < len(lines):
+            line = lines[i]
+            if not line.strip():
+                next_i = i
+                while next_i < len(lines) and not lines[next_i].strip():
+                    next_i += 1
+                if next_i < len(lines) and _indent_of(lines[next_i]) >= content_col:
+                    # Blank lines within the item
+                    item_lines.extend([''] * (next_i - i))
+                    loose = True
+                    i = next_i
+                    continue
+                i = next_i
+                next_match = _LIST_ITEM.match(lines[i]) if i < len(lines) else None
+                if next_match is not None and _list_type(next_match.group(2)) == list_type:
+                    # Blank lines between items
+                    loose = True
+                break
+            if _indent_of(line) >= content_col:
+                item_lines.append(line[content_col:])
+            elif _LIST_ITEM.match(line):
+                break
+            else:
+                # Lazy continuation line
+                item_lines.append(line.strip())
+            i += 1
+        items.append(_parse_blocks(item_lines, in_list_item=True))
+
+    if not loose:
+        items = [[('plain',) + block[1:] if block[0] == 'para' else block for block in item] for item in items]
+    return ('list', list_type, start, items), i
+
+
+def _table_cells(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip() for cell in _TABLE_CELL_BREAK.split(line)]
+
+
+def _parse_table(lines: List[str], i: int) -> Tuple[tuple, int]:
+    header = _table_cells(lines[i])
+    separators = _table_cells(lines[i + 1])
+    table_lines = lines[i:i + 2]
+    i += 2
+    rows = []
+    while i < len(lines) and lines[i].strip() and '|' in lines[i]:
+        table_lines.append(lines[i])
+        rows.append(_table_cells(lines[i]))
+        i += 1
+    num_columns = len(separators)
+    rows = [(row + [''] * num_columns)[:num_columns] for row in [header] + rows]
+    if max(len(line.strip()) for line in table_lines) > WIDTH:
+        # As in pandoc, tables too wide for the source to fit get columns in proportion to the separator dashes
+        separator_lengths = [len(separator) for separator in separators]
+        widths = [length / sum(separator_lengths) for length in separator_lengths]
+    else:
+        widths = [0.0] * num_columns
+    return ('table', widths, rows), i
+
+
+# Inline parsing
+
+def _find_closing_delimiter(text: str, delimiter: str, start: int) -> int:
+    pos = start
+    while True:
+        pos = text.find(delimiter, pos)
+        if pos == -1:
+            return -1
+        after = text[pos + len(delimiter):pos + len(delimiter) + 1]
+        valid = not text[pos - 1].isspace()
+        if delimiter[0] == '_':
+            valid = valid and not after.isalnum()
+        if len(delimiter) == 1 and after == delimiter:
+            # Part of a longer delimiter run
+            valid = False
+            pos += 1
+        if valid:
+            return pos
+        pos += 1
+
+
+def _find_closing_bracket(text: str, start: int) -> int:
+    depth = 0
+    pos = start
+    while pos < len(text):
+        char = text[pos]
+        if char == '\\':
+            pos += 2
+            continue
+        if char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+            if depth == 0:
+                return pos
+        pos += 1
+    return -1
+
+
+def _parse_inlines(text: str) -> List[Node]:
+    nodes: List[Node] = []
+    buffer: List[str] = []
+
+    def flush():
+        if buffer:
+            nodes.append(('str', ''.join(buffer), []))
+            buffer.clear()
+
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in ' \n':
+            flush()
+            if not nodes or nodes[-1][0] != 'space':
+                nodes.append(('space', None, []))
+            i += 1
+            continue
+
+        if char == '\\' and i + 1 < len(text) and text[i + 1] in _ESCAPABLE:
+            buffer.append(text[i + 1])
+            i += 2
+            continue
+
+        if char == '`':
+            run_end = i
+            while run_end < len(text) and text[run_end] == '`':
+                run_end += 1
+            run = text[i:run_end]
+            close = text.find(run, run_end)
+            while close != -1 and text[close + len(run):close + len(run) + 1] == '`':
+                close = text.find(run, close + len(run) + 1)
+            if close == -1:
+                buffer.append(run)
+                i = run_end
+                continue
+            flush()
+            nodes.append(('code', text[run_end:close].replace('\n', ' ').strip(), []))
+            i = close + len(run)
+            continue
+
+        if char == '$' and i + 1 < len(text) and not text[i + 1].isspace():
+            close = text.find('$', i + 1)
+            if close != -1 and not text[close - 1].isspace() and not text[close + 1:close + 2].isdigit():
+                flush()
+                nodes.append(('math', text[i + 1:close], []))
+                i = close + 1
+                continue
+
+        if char == '<':
+            autolink_match = _AUTOLINK.match(text, i)
+            if autolink_match:
+                buffer.append(autolink_match.group(1))
+                i = autolink_match.end()
+                continue
+            tag_match = _HTML_TAG.match(text, i)
+            if tag_match:
+                # Raw HTML has no equivalent in rst, only the contents of tags are kept
+                flush()
+                i = tag_match.end()
+                continue
+
+        if char == '&':
+            entity_match = _ENTITY.match(text, i)
+            if entity_match:
+                buffer.append(html.unescape(entity_match.group()))
+                i = entity_match.end()
+                continue
+
+        if char == '[':
+            close = _find_closing_bracket(text, i)
+            destination_match = _LINK_DESTINATION.match(text, close + 1) if close != -1 else None
+            if destination_match:
+                flush()
+                nodes.append(('link', destination_match.group(1), _parse_inlines(text[i + 1:close])))
+                i = destination_match.end()
+                continue
+
+        if char in '*_':
+            delimiter = text[i:i + 2] if text[i:i + 2] == char * 2 else char
+            after = text[i + len(delimiter):i + len(delimiter) + 1]
+            before = text[i - 1] if i else ' '
+            can_open = after != '' and not after.isspace() and not (char == '_' and before.isalnum())
+            close = _find_closing_delimiter(text, delimiter, i + len(delimiter)) if can_open else -1
+            if close != -1:
+                flush()
+                kind = 'strong' if len(delimiter) == 2 else 'emph'
+                nodes.append((kind, None, _parse_inlines(text[i + len(delimiter):close])))
+                i = close + len(delimiter)
+                continue
+
+        buffer.append(char)
+        i += 1
+
+    flush()
+    return nodes
+
+
+# Inline rendering
+
+def _smarten(text: str, before: str, after: str) -> str:
+    text = text.replace('---', '—').replace('--', '–').replace('...', '…')
+    out = []
+    for i, char in enumerate(text):
+        prev_char = text[i - 1] if i else before
+        next_char = text[i + 1] if i + 1 < len(text) else after
+        opening = (prev_char.isspace() or prev_char in _OPENING_CONTEXT) and not next_char.isspace()
+        if char == "'":
+            char = '‘' if opening else '’'
+        elif char == '"':
+            char = '“' if opening else '”'
+        out.append(char)
+    return ''.join(out)
+
+
+def _escape(text: str) -> str:
+    out = []
+    for i, char in enumerate(text):
+        if char in '\\`*':
+            char = '\\' + char
+        elif char in '_|':
+            at_word_start = i == 0 or not text[i - 1].isalnum()
+            at_word_end = i == len(text) - 1 or not text[i + 1].isalnum()
+            if at_word_start or at_word_end:
+                char = '\\' + char
+        out.append(char)
+    return ''.join(out)
+
+
+def _edge_char(node: Optional[Node], last: bool) -> str:
+    # Character context a node gives its neighbors for smart quotes
+    if node is None or node[0] == 'space':
+        return ' '
+    if node[0] == 'str':
+        return node[1][-1] if last else node[1][0]
+    return 'a'
+
+
+def _join_adjacent(pieces: List[Piece]) -> List[Piece]:
+    joined: List[Piece] = []
+    for piece in pieces:
+        if piece is None:
+            if joined and joined[-1] is not None:
+                joined.append(None)
+            continue
+        if not joined or joined[-1] is None:
+            joined.append(list(piece))
+            continue
+        previous = joined[-1]
+        separator = ''
+        if previous[2] and (piece[1] or piece[0][0] not in _OK_AFTER_MARKUP):
+            separator = '\\ '
+        elif piece[1] and previous[0][-1] not in _OK_BEFORE_MARKUP:
+            separator = '\\ '
+        joined[-1] = [previous[0] + separator + piece[0], previous[1], piece[2]]
+    while joined and joined[-1] is None:
+        joined.pop()
+    return joined
+
+
+def _plain_text(nodes: List[Node]) -> str:
+    parts = []
+    for kind, value, children in nodes:
+        if kind == 'space':
+            parts.append(' ')
+        elif kind in ('str', 'code', 'math'):
+            parts.append(value)
+        else:
+            parts.append(_plain_text(children))
+    return ''.join(parts)
+
+
+def _wrap_markup(pieces: List[Piece], opening: str, closing: str) -> List[Piece]:
+    words = _join_adjacent(pieces)
+    if not words:
+        return [[opening + closing, True, True]]
+    # Spaces are never at the ends after joining
+    first = words[0]
+    assert first is not None
+    words[0] = [opening + first[0], True, first[2]]
+    last = words[-1]
+    assert last is not None
+    words[-1] = [last[0] + closing, last[1], True]
+    return words
+
+
+def _render_inlines(nodes: List[Node], in_link: bool = False) -> List[Piece]:
+    pieces: List[Piece] = []
+    for i, (kind, value, children) in enumerate(nodes):
+        if kind == 'space':
+            pieces.append(None)
+        elif kind == 'str':
+            before = _edge_char(nodes[i - 1] if i else None, last=True)
+            after = _edge_char(nodes[i + 1] if i + 1 < len(nodes) else None, last=False)
+            pieces.append([_escape(_smarten(value, before, after)), False, False])
+        elif kind == 'code':
+            if '`' in value:
+                pieces.append([':literal:`' + value + '`', True, True])
+            else:
+                pieces.append(['``' + value + '``', True, True])
+        elif kind == 'math':
+            pieces.append([':math:`' + value + '`', True, True])
+        elif kind in ('emph', 'strong'):
+            if in_link:
+                # Links in rst can't contain other markup
+                pieces.extend(_render_inlines(children, in_link=True))
+                continue
+            delimiter = '*' if kind == 'emph' else '**'
+            plain_pieces: List[Piece] = []
+            for word in _plain_text(children).split(' '):
+                plain_pieces.extend([None, [_escape(word), False, False]])
+            pieces.extend(_wrap_markup(plain_pieces[1:], delimiter, delimiter))
+        elif kind == 'link':
+            pieces.extend(_wrap_markup(_render_inlines(children, in_link=True), '`', f' <{value}>`__'))
+    return pieces
+
+
+def _inline_words(text: str) -> List[str]:
+    return [piece[0] for piece in _join_adjacent(_render_inlines(_parse_inlines(text))) if piece is not None]
+
+
+def _wrap(words: List[str], width: int) -> List[str]:
+    lines: List[str] = []
+    line = ''
+    for word in words:
+        if not line:
+            line = word
+        elif len(line) + 1 + len(word) <= width:
+            line += ' ' + word
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+    return lines
+
+
+# Block rendering
+
+def _render_blocks(blocks: List[tuple], width: int) -> List[str]:
+    out: List[str] = []
+    for block in blocks:
+        lines, blank_after = _render_block(block, width)
+        if not lines:
+            continue
+        if out and out[-1] != '':
+            out.append('')
+        out.extend(lines)
+        if blank_after:
+            out.append('')
+    return out
+
+
+def _render_block(block: tuple, width: int) -> Tuple[List[str], bool]:
+    kind = block[0]
+    if kind == 'heading':
+        _, level, text = block
+        title = ' '.join(_inline_words(text))
+        return [title, HEADING_CHARS[level - 1] * len(title)], True
+    if kind in ('para', 'plain'):
+        return _wrap(_inline_words(block[1]), width), kind == 'para'
+    if kind == 'code':
+        _, language, code_lines = block
+        directive = f'.. code:: {language}' if language else '::'
+        return [directive, ''] + ['   ' + line if line else '' for line in code_lines], True
+    if kind == 'list':
+        _, list_type, start, items = block
+        lines = []
+        markers = ['-' if list_type == '-' else f'{number}{list_type}' for number in range(start, start + len(items))]
+        # As pandoc does, markers are padded to the widest so that all the items' contents line up
+        marker_width = max(len(marker) for marker in markers) if markers else 0
+        for marker, item in zip(markers, items):
+            prefix = marker.ljust(marker_width) + ' '
+            item_lines = _render_blocks(item, width - len(prefix))
+            if not item_lines:
+                item_lines = ['']
+            lines.append((prefix + item_lines[0]).rstrip())
+            lines.extend(' ' * len(prefix) + line if line else '' for line in item_lines[1:])
+        return lines, True
+    if kind == 'table':
+        _, widths, rows = block
+        if all(width == 0 for width in widths) and len(widths) > 1:
+            lines = _simple_table(rows)
+            if max(len(line) for line in lines) <= width:
+                return lines, True
+        return _grid_table(rows, widths, width), True
+    raise ValueError(f'Unknown block {kind}')
+
+
+def _render_cell(text: str, width: int) -> List[str]:
+    return _wrap(_inline_words(text), width)
+
+
+def _simple_table(rows: List[List[str]]) -> List[str]:
+    cells = [[' '.join(_inline_words(text)) for text in row] for row in rows]
+    for row in cells:
+        if not row[0]:
+            # Empty cells in the first column are not allowed in simple tables
+            row[0] = '\\ '
+    column_widths = [max(len(row[column]) for row in cells) for column in range(len(cells[0]))]
+    border = ' '.join('=' * column_width for column_width in column_widths)
+    lines = [' '.join(cell.ljust(column_width) for cell, column_width in zip(row, column_widths)).rstrip()
+             for row in cells]
+    return [border, lines[0], border] + lines[1:] + [border]
+
+
+def _grid_table(rows: List[List[str]], widths: List[float], width: int) -> List[str]:
+    num_columns = len(widths)
+    if all(column_width == 0 for column_width in widths):
+        cells = [[_render_cell(text, width) for text in row] for row in rows]
+        column_widths = [max((len(line) for row in cells for line in row[column]), default=0)
+                         for column in range(num_columns)]
+        if sum(column_widths) > width - (3 * num_columns + 1):
+            widths = [1 / num_columns] * num_columns
+    if any(column_width != 0 for column_width in widths):
+        column_widths = [max(int(width * column_width) - 3, 1) for column_width in widths]
+        cells = [[_render_cell(text, column_width) for text, column_width in zip(row, column_widths)]
+                 for row in rows]
+        # Words longer than the column widen it
+        column_widths = [max([column_widths[column]] + [len(line) for row in cells for line in row[column]])
+                         for column in range(num_columns)]
+
+    def border(char: str) -> str:
+        return '+' + '+'.join(char * (column_width + 2) for column_width in column_widths) + '+'
+
+    lines = [border('-')]
+    for row_number, row in enumerate(cells):
+        height = max(max(len(cell) for cell in row), 1)
+        for line_number in range(height):
+            lines.append('|' + '|'.join(
+                ' ' + (cell[line_number] if line_number < len(cell) else '').ljust(column_width) + ' '
+                for cell, column_width in zip(row, column_widths)
+            ) + '|')
+        lines.append(border('=' if row_number == 0 else '-'))
+    return lines
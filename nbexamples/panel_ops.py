@@ -0,0 +1,288 @@
+"""Fast operations on firm x date panels which have gaps in the dates of each firm.
+Used in Data Management in Python and benchmarked in benchmarks/panel_lags.py.
+
+panel_lag and panel_lead give the value of the observation exactly n periods before or after
+each row for the same firm, or missing if there is no such observation. This is what filling the
+panel with the missing firm-dates, running groupby().shift and dropping the filled rows gives
+(dense_panel_shift), but without creating the dense panel.
+
+panel_resample and panel_upsample give the same results as df.groupby(id_col).resample(freq) with an
+aggregation or a fill, which runs a separate resample for every firm. Instead they work on all the firms
+at once, so they stay fast with thousands of firms. Benchmarked in benchmarks/panel_resample.py.
+"""
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+Columns = Union[str, Sequence[str]]
+
+DAY_NANOS = pd.Timedelta('1D').value
+
+# What resample gives for bins without observations, missing for other aggregations
+EMPTY_BIN_VALUES = {'sum': 0, 'count': 0, 'nunique': 0, 'prod': 1}
+
+
+def _period_positions(dates: pd.Series, freq: Optional[str] = None,
+                      calendar: Optional[Sequence] = None) -> np.ndarray:
+    """
+    Integer position of each date in its calendar, so that consecutive periods differ by one,
+    -1 for missing dates and dates not in calendar
+    """
+    dates = pd.DatetimeIndex(dates)
+    if freq is not None:
+        if calendar is not None:
+            raise ValueError('pass only one of freq and calendar')
+        positions = dates.to_period(freq).asi8.copy()
+        # Ordinals count from 1970 so may be negative, start them at zero
+        missing = np.asarray(dates.isna())
+        if not missing.all():
+            positions -= positions[~missing].min()
+        positions[missing] = -1
+        return positions
+    if calendar is None:
+        calendar = dates.dropna().unique()
+    return pd.DatetimeIndex(calendar).sort_values().unique().get_indexer(dates)
+
+
+def panel_shift(df: pd.DataFrame, cols: Columns, id_col: str, date_col: str, periods: int = 1,
+                freq: Optional[str] = None, calendar: Optional[Sequence] = None) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Values of cols from the observation of the same id exactly periods periods earlier, like
+    df.groupby(id_col)[cols].shift(periods) on the panel with every id-date filled in. Negative
+    periods look ahead. df does not need to be sorted, but each id-date must be unique.
+
+    :param freq: pandas frequency of the dates, e.g. 'D', 'B', 'M', 'Q'. Dates are converted to periods
+        of this frequency, so month end and month start dates both work with 'M'
+    :param calendar: all the dates in order, e.g. trading days from synthetic_panels.trading_days.
+        Dates not in the calendar get missing values
+    :return: Series if cols is a single column, otherwise DataFrame, with the index of df.
+        Rows with a missing id or date, or without an observation exactly periods back, are missing.
+        Default with neither freq nor calendar is to use every date in df as the calendar
+    """
+    positions = _period_positions(df[date_col], freq=freq, calendar=calendar)
+    ids, _ = pd.factorize(df[id_col])
+    valid_rows = np.flatnonzero((ids >= 0) & (positions >= 0))
+
+    # One integer per id-period, spaced so that shifting by periods can't reach another id.
+    # Intermediate arrays are updated in place and deleted as soon as possible, as they are as long as df
+    span = int(positions.max(initial=0)) + 1 + 2 * abs(periods)
+    keys = ids[valid_rows].astype(np.int64)
+    del ids
+    keys *= span
+    keys += positions[valid_rows]
+    del positions
+    # Usually already sorted by id and date, which makes the sort quick
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    sorted_rows = valid_rows[order]
+    del order, valid_rows
+    if len(keys) and (keys[1:] == keys[:-1]).any():
+        raise ValueError(f'{id_col} and {date_col} must uniquely identify rows to shift')
+
+    # Search in sorted order, which is much faster than searching for the keys in the order of df
+    targets = keys - periods
+    matches = np.searchsorted(keys, targets)
+    matches.clip(max=max(len(keys) - 1, 0), out=matches)
+    found = keys[matches] == targets
+    del keys, targets
+    source_rows = np.full(len(df), -1, dtype=np.int64)
+    source_rows[sorted_rows[found]] = sorted_rows[matches[found]]
+
+    if isinstance(cols, str):
+        return pd.Series(
+            take(df[cols].to_numpy(), source_rows, allow_fill=True), index=df.index, name=cols
+        )
+    return pd.DataFrame(
+        {col: take(df[col].to_numpy(), source_rows, allow_fill=True) for col in cols}, index=df.index
+    )
+
+
+def panel_lag(df: pd.DataFrame, cols: Columns, id_col: str, date_col: str, periods: int = 1,
+              freq: Optional[str] = None, calendar: Optional[Sequence] = None) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Values of cols from exactly periods periods earlier for the same id, see panel_shift
+    """
+    return panel_shift(df, cols, id_col, date_col, periods=periods, freq=freq, calendar=calendar)
+
+
+def panel_lead(df: pd.DataFrame, cols: Columns, id_col: str, date_col: str, periods: int = 1,
+               freq: Optional[str] = None, calendar: Optional[Sequence] = None) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Values of cols from exactly periods periods later for the same id, see panel_shift
+    """
+    return panel_shift(df, cols, id_col, date_col, periods=-periods, freq=freq, calendar=calendar)
+
+
+def dense_panel_shift(df: pd.DataFrame, cols: Columns, id_col: str, date_col: str, periods: int = 1,
+                      freq: Optional[str] = None,
+                      calendar: Optional[Sequence] = None) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Same result as panel_shift by filling in every id-date, shifting within each id and dropping the
+    filled rows. Much slower and uses memory for the whole dense panel, kept to check and benchmark
+    panel_shift against
+    """
+    positions = _period_positions(df[date_col], freq=freq, calendar=calendar)
+    valid = df[id_col].notna().to_numpy() & (positions >= 0)
+    value_cols = [cols] if isinstance(cols, str) else list(cols)
+    ids = df[id_col].to_numpy()[valid]
+    data = df[value_cols].iloc[valid]
+    data.index = pd.MultiIndex.from_arrays([ids, positions[valid]])
+    dense_index = pd.MultiIndex.from_product([pd.unique(ids), np.arange(positions.max(initial=-1) + 1)])
+    shifted = data.reindex(dense_index).groupby(level=0).shift(periods).reindex(data.index)
+
+    # Back to the rows of df, with missing values for rows which were not in the panel
+    source_rows = np.full(len(df), -1, dtype=np.int64)
+    source_rows[valid] = np.arange(valid.sum())
+    result = pd.DataFrame(
+        {col: take(shifted[col].to_numpy(), source_rows, allow_fill=True) for col in value_cols}, index=df.index
+    )
+    if isinstance(cols, str):
+        return result[cols]
+    return result
+
+
+def _bin_length(freq: str, index: pd.DatetimeIndex) -> Optional[int]:
+    """
+    Length of freq in units of the index's integer values (nanoseconds, or e.g. microseconds for indexes
+    which newer pandas creates with a coarser unit) if its bins start at midnight for every firm, as they
+    do in groupby().resample(), so that the bins are the timestamps floored to freq. None otherwise,
+    e.g. for '7min', '2D', 'M' or a timezone aware index
+    """
+    offset = to_offset(freq)
+    if not isinstance(offset, Tick) or DAY_NANOS % offset.nanos or index.tz is not None:
+        return None
+    unit, count = np.datetime_data(index.dtype)
+    unit_nanos = pd.Timedelta(count, unit=unit).value
+    if offset.nanos % unit_nanos:
+        return None
+    return offset.nanos // unit_nanos
+
+
+def _label_ranges(ids: np.ndarray, bins: np.ndarray,
+                  bin_length: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For ids and bins sorted by id then bin, the bins from the first to the last bin of each id,
+    which is the index groupby().resample() gives to each id
+
+    :return: id of each label, label bins, and for each id, the position of its first row and first label
+    """
+    row_starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    first_bins = bins[row_starts]
+    num_labels = (bins[np.r_[row_starts[1:], len(ids)] - 1] - first_bins) // bin_length + 1
+    label_starts = np.r_[0, np.cumsum(num_labels)[:-1]]
+    steps = np.arange(num_labels.sum(), dtype=np.int64) - np.repeat(label_starts, num_labels)
+    label_bins = np.repeat(first_bins, num_labels) + steps * bin_length
+    return np.repeat(ids[row_starts], num_labels), label_bins, row_starts, label_starts
+
+
+def _label_index(keys: pd.Index, label_ids: np.ndarray, label_bins: np.ndarray, bin_length: int,
+                 names: Sequence[Optional[str]], dtype: np.dtype) -> pd.MultiIndex:
+    """
+    Index of ids and bins from the codes, which is much faster than letting MultiIndex find them
+
+    :param dtype: dtype of the bins, the datetime64 dtype of the index the bins are in units of
+    """
+    first_bin = label_bins.min() if len(label_bins) else 0
+    num_bins = (label_bins.max() - first_bin) // bin_length + 1 if len(label_bins) else 0
+    # Integer steps, as arange with the large integers of timestamps can lose the last bin to floats
+    bin_values = (first_bin + bin_length * np.arange(num_bins, dtype=np.int64)).view(dtype)
+    bins = pd.DatetimeIndex(bin_values, freq=pd.Timedelta(bin_length, unit=np.datetime_data(dtype)[0]))
+    return pd.MultiIndex(
+        levels=[keys, bins], codes=[label_ids, (label_bins - first_bin) // bin_length], names=names,
+        verify_integrity=False
+    )
+
+
+def panel_resample(df: pd.DataFrame, id_col: str, freq: str, how: str = 'mean') -> pd.DataFrame:
+    """
+    Same result as df.groupby(id_col)[cols].resample(freq).agg(how) for the columns other than id_col,
+    with one groupby of id_col and the bins of freq for all the ids, e.g. to get daily means from
+    intraday data. df must have a DatetimeIndex
+
+    :param freq: pandas frequency, e.g. '1D', '1H', '10min'. Frequencies which don't evenly divide
+        a day use groupby().resample(), as their bins depend on the first timestamp of each id
+    :param how: name of the aggregation, e.g. 'mean', 'sum', 'last', 'max'
+    """
+    cols = [col for col in df.columns if col != id_col]
+    bin_length = _bin_length(freq, df.index)
+    if bin_length is None:
+        return df.groupby(id_col)[cols].resample(freq).agg(how)
+    if how in ('first', 'last') and not df.index.is_monotonic_increasing:
+        # Rows in each bin are in the order of df, while resample takes them in time order
+        df = df.iloc[np.argsort(df.index.asi8, kind='stable')]
+    aggregated = df.groupby([id_col, pd.Grouper(freq=freq)])[cols].agg(how)
+
+    # groupby only has the bins with observations, resample also has the empty bins between them
+    ids = aggregated.index.codes[0]
+    bins = aggregated.index.levels[1].asi8.take(aggregated.index.codes[1])
+    label_ids, label_bins, _, _ = _label_ranges(ids, bins, bin_length)
+    if len(label_bins) == len(aggregated):
+        return aggregated
+    full_index = _label_index(aggregated.index.levels[0], label_ids, label_bins, bin_length, aggregated.index.names,
+                              df.index.dtype)
+    return aggregated.reindex(full_index, fill_value=EMPTY_BIN_VALUES.get(how, np.nan))
+
+
+def panel_upsample(df: pd.DataFrame, id_col: str, freq: str, method: str = 'bfill',
+                   limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    Same result as df.groupby(id_col).resample(freq).bfill(limit) or .ffill(limit) by finding the
+    observation for every label of every id with one searchsorted. df must have a DatetimeIndex and does
+    not need to be sorted, but each id-timestamp must be unique
+
+    :param freq: pandas frequency, e.g. '1H', '10min'. Frequencies which don't evenly divide
+        a day use groupby().resample(), as their bins depend on the first timestamp of each id
+    :param method: 'bfill' to fill labels from the next observation, 'ffill' from the previous one
+    :param limit: maximum number of labels in a row to fill from one observation, default no limit
+    """
+    if method not in ('bfill', 'ffill'):
+        raise ValueError(f'method must be bfill or ffill, got {method}')
+    bin_length = _bin_length(freq, df.index)
+    if bin_length is None:
+        return getattr(df.groupby(id_col).resample(freq), method)(limit=limit)
+
+    # Sort by id and timestamp, which is quick if already sorted, dropping rows groupby would drop
+    ids, keys = pd.factorize(df[id_col], sort=True)
+    times = df.index.asi8
+    rows = np.flatnonzero((ids >= 0) & ~np.asarray(df.index.isna()))
+    rows = rows[np.lexsort((times[rows], ids[rows]))]
+    ids = ids[rows]
+    times = times[rows]
+    if ((ids[1:] == ids[:-1]) & (times[1:] == times[:-1])).any():
+        raise ValueError(f'{id_col} and the index must uniquely identify rows to upsample')
+
+    label_ids, label_bins, row_starts, label_starts = _label_ranges(ids, times // bin_length * bin_length, bin_length)
+    rows_per_id = np.diff(np.r_[row_starts, len(ids)])
+    # Position of each row among the labels of all the ids, rounded down and up for rows between labels.
+    # A label's bfill is the first row rounded down to it or later, and its ffill the last row rounded
+    # up to it or earlier. The labels between a row and its position rounded the other way are fills
+    shifts = np.repeat(label_starts - label_bins[label_starts] // bin_length, rows_per_id)
+    floor_positions = times // bin_length + shifts
+    ceil_positions = -(-times // bin_length) + shifts
+    del times, shifts
+    label_positions = np.arange(len(label_bins))
+    if method == 'bfill':
+        # The last row of each id is rounded down to its last label, so this never reaches the next id
+        matches = np.searchsorted(floor_positions, label_positions)
+        distances = ceil_positions[matches] - label_positions
+        source_rows = rows[matches]
+    else:
+        matches = np.searchsorted(ceil_positions, label_positions, side='right') - 1
+        # The first label of an id is before its first row if that is between labels, then the match
+        # is the last row of the previous id
+        found = matches >= 0
+        matches.clip(min=0, out=matches)
+        found &= ids[matches] == label_ids
+        distances = label_positions - floor_positions[matches]
+        source_rows = np.where(found, rows[matches], -1)
+    if limit is not None:
+        source_rows[distances > limit] = -1
+
+    return pd.DataFrame(
+        {col: take(df[col].to_numpy(), source_rows, allow_fill=True) for col in df.columns},
+        index=_label_index(keys, label_ids, label_bins, bin_length, [id_col, df.index.name], df.index.dtype)
+    )
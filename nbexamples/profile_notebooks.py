@@ -0,0 +1,339 @@
+"""Execute jupyter notebooks cell by cell in a local kernel and profile every code cell.
+Usage: python profile_notebooks.py <folder or notebook.ipynb> [-o report.json] [--table report.md]
+       [--compare baseline.json]
+Records for every code cell the wall time, the peak increase in kernel memory (RSS) and the
+largest DataFrame in the kernel namespace after the cell ran.
+Dependencies:
+jupyter_client, ipykernel, psutil: install using `pipenv install --dev`
+"""
+import ast
+import hashlib
+import html
+import json
+import os
+import sys
+import time
+from queue import Empty
+from typing import Optional, List, Dict, Any, Iterable
+
+try:
+    import psutil
+    from jupyter_client import KernelManager
+except ImportError as e:
+    raise ImportError(
+        f'{e.name} is required to profile notebooks, install the dev packages using `pipenv install --dev`'
+    ) from e
+
+from ipynb_to_gallery import iter_notebook_cells
+
+# How often to sample the kernel memory while a cell is executing
+MEMORY_POLL_SECONDS = 0.005
+
+# Defined in the kernel before the notebook runs, evaluated after every cell as a user expression
+_LARGEST_DATAFRAME_HELPER = '''
+def _profile_notebooks_largest_dataframe():
+    import sys
+    pd = sys.modules.get('pandas')
+    if pd is None:
+        return None
+    largest = None
+    for name, value in list(globals().items()):
+        if isinstance(value, pd.DataFrame) and not name.startswith('_'):
+            size = int(value.memory_usage(deep=True).sum())
+            if largest is None or size > largest[1]:
+                largest = (name, size)
+    return largest
+'''
+_LARGEST_DATAFRAME_EXPRESSION = '_profile_notebooks_largest_dataframe()'
+
+
+class NotebookProfilingError(Exception):
+    pass
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode('utf8')).hexdigest()
+
+
+def _first_line(source: str, max_length: int = 60) -> str:
+    line = source.strip().splitlines()[0] if source.strip() else ''
+    if len(line) > max_length:
+        line = line[:max_length - 3] + '...'
+    return line
+
+
+def _kernel_pid(km: KernelManager) -> int:
+    provisioner = getattr(km, 'provisioner', None)
+    if provisioner is not None:
+        return provisioner.pid
+    # jupyter_client < 7, which has no provisioner but exposes the kernel process
+    return getattr(km, 'kernel').pid
+
+
+def _execute_silently(kc, code: str, timeout: Optional[float] = None):
+    reply = kc.execute_interactive(code, silent=True, store_history=False, timeout=timeout)
+    if reply['content']['status'] != 'ok':
+        raise NotebookProfilingError(f'Could not set up profiling in the kernel: {reply["content"]}')
+
+
+def _profile_cell(kc, process: psutil.Process, source: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    rss_before = peak_rss = process.memory_info().rss
+    start = time.perf_counter()
+    msg_id = kc.execute(source)
+    while True:
+        try:
+            reply = kc.get_shell_msg(timeout=MEMORY_POLL_SECONDS)
+        except Empty:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return dict(status='timeout', wall_time=time.perf_counter() - start,
+                            peak_rss_delta=peak_rss - rss_before, largest_dataframe=None)
+            continue
+        if reply['parent_header'].get('msg_id') == msg_id:
+            break
+    wall_time = time.perf_counter() - start
+    peak_rss = max(peak_rss, process.memory_info().rss)
+    content = reply['content']
+    result = dict(
+        status=content['status'],
+        wall_time=wall_time,
+        peak_rss_delta=peak_rss - rss_before,
+        largest_dataframe=None,
+    )
+    if content['status'] == 'error':
+        result['error'] = f'{content["ename"]}: {content["evalue"]}'
+        return result
+    # Measured separately so that the time to size the DataFrames doesn't count towards the cell
+    expressions = kc.execute_interactive(
+        '', silent=True, store_history=False, user_expressions={'largest_dataframe': _LARGEST_DATAFRAME_EXPRESSION}
+    )['content'].get('user_expressions', {})
+    expression = expressions.get('largest_dataframe', {})
+    if expression.get('status') == 'ok':
+        largest = ast.literal_eval(expression['data']['text/plain'])
+        if largest is not None:
+            result['largest_dataframe'] = dict(name=largest[0], bytes=largest[1])
+    return result
+
+
+def _drain_iopub(kc):
+    while True:
+        try:
+            kc.get_iopub_msg(timeout=0)
+        except Empty:
+            return
+
+
+def profile_notebook(file_path: str, kernel_name: str = 'python3', timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Execute the notebook in a new kernel started in the notebook's folder, stopping at the first cell
+    which errors or times out
+    """
+    km = KernelManager(kernel_name=kernel_name)
+    env = dict(os.environ, MPLBACKEND='Agg')
+    km.start_kernel(cwd=os.path.dirname(os.path.abspath(file_path)), env=env)
+    cells = []
+    try:
+        kc = km.client()
+        kc.start_channels()
+        kc.wait_for_ready(timeout=60)
+        process = psutil.Process(_kernel_pid(km))
+        _execute_silently(kc, _LARGEST_DATAFRAME_HELPER)
+        for index, cell in enumerate(iter_notebook_cells(file_path)):
+            if cell.cell_type != 'code' or not cell.source.strip():
+                continue
+            print(f'Profiling cell {index} of {file_path}: {_first_line(cell.source)}')
+            result = _profile_cell(kc, process, cell.source, timeout=timeout)
+            # Outputs are not needed, don't let them pile up in memory
+            _drain_iopub(kc)
+            cells.append(dict(
+                cell=index,
+                source=_first_line(cell.source),
+                source_hash=source_hash(cell.source),
+                **result
+            ))
+            if result['status'] != 'ok':
+                print(f'Cell {index} of {file_path} did not finish ({result["status"]}), '
+                      f'not running the rest of the notebook', file=sys.stderr)
+                break
+        kc.stop_channels()
+    finally:
+        km.shutdown_kernel(now=True)
+    return dict(
+        cells=cells,
+        total_wall_time=sum(cell['wall_time'] for cell in cells),
+    )
+
+
+def _notebooks_in(paths: Iterable[str]) -> List[str]:
+    notebooks: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            notebooks.extend(
+                os.path.join(path, file) for file in sorted(os.listdir(path)) if file.endswith('.ipynb')
+            )
+        else:
+            notebooks.append(path)
+    return notebooks
+
+
+def profile_notebooks(paths: Iterable[str], kernel_name: str = 'python3',
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+    notebooks = {}
+    for file_path in _notebooks_in(paths):
+        notebooks[os.path.basename(file_path)] = profile_notebook(file_path, kernel_name=kernel_name, timeout=timeout)
+    return dict(notebooks=notebooks)
+
+
+def report_has_failures(report: Dict[str, Any]) -> bool:
+    return any(
+        cell['status'] != 'ok' for notebook in report['notebooks'].values() for cell in notebook['cells']
+    )
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.25,
+                    min_seconds: float = 0.5, min_memory_mb: float = 50) -> List[str]:
+    """
+    Find cells which got slower or used more memory than in the baseline by more than threshold as a
+    fraction of the baseline and by more than the absolute minimums, which keep fast cells from being
+    flagged on noise. Cells are matched by position and only compared if their source did not change.
+
+    :return: description of every regression
+    """
+    regressions = []
+    for notebook_name, notebook in report['notebooks'].items():
+        baseline_cells = {
+            cell['cell']: cell for cell in baseline['notebooks'].get(notebook_name, {}).get('cells', [])
+        }
+        for cell in notebook['cells']:
+            baseline_cell = baseline_cells.get(cell['cell'])
+            if baseline_cell is None or baseline_cell['source_hash'] != cell['source_hash']:
+                continue
+            description = f'{notebook_name} cell {cell["cell"]} ({cell["source"]})'
+            old_time, new_time = baseline_cell['wall_time'], cell['wall_time']
+            if new_time - old_time > max(old_time * threshold, min_seconds):
+                regressions.append(f'{description}: wall time {old_time:.2f}s -> {new_time:.2f}s')
+            old_memory, new_memory = baseline_cell['peak_rss_delta'], cell['peak_rss_delta']
+            if new_memory - old_memory > max(old_memory * threshold, min_memory_mb * 1024 ** 2):
+                regressions.append(
+                    f'{description}: peak memory increase {_mb(old_memory)} -> {_mb(new_memory)}'
+                )
+    return regressions
+
+
+def _mb(num_bytes: Optional[int]) -> str:
+    if num_bytes is None:
+        return ''
+    return f'{num_bytes / 1024 ** 2:.1f} MB'
+
+
+def _table_rows(notebook: Dict[str, Any]) -> List[List[str]]:
+    rows = []
+    for cell in notebook['cells']:
+        largest = cell['largest_dataframe']
+        rows.append([
+            str(cell['cell']),
+            cell['source'],
+            f'{cell["wall_time"]:.3f}',
+            _mb(cell['peak_rss_delta']),
+            f'{largest["name"]} ({_mb(largest["bytes"])})' if largest else '',
+            f'{cell["status"]}: {cell["error"]}' if 'error' in cell else cell['status'],
+        ])
+    return rows
+
+
+_TABLE_HEADER = ['Cell', 'Source', 'Wall time (s)', 'Peak memory increase', 'Largest DataFrame', 'Status']
+
+
+def report_to_markdown(report: Dict[str, Any]) -> str:
+    lines = ['# Notebook cell profile', '']
+    for notebook_name, notebook in report['notebooks'].items():
+        lines.extend([
+            f'## {notebook_name}',
+            '',
+            f'Total wall time: {notebook["total_wall_time"]:.2f}s',
+            '',
+            '| ' + ' | '.join(_TABLE_HEADER) + ' |',
+            '|' + '---|' * len(_TABLE_HEADER),
+        ])
+        for row in _table_rows(notebook):
+            cells = [value.replace('|', r'\|') for value in row]
+            cells[1] = f'`{cells[1]}`' if cells[1] else ''
+            lines.append('| ' + ' | '.join(cells) + ' |')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def report_to_html(report: Dict[str, Any]) -> str:
+    parts = ['<html><head><meta charset="utf-8"><title>Notebook cell profile</title></head><body>',
+             '<h1>Notebook cell profile</h1>']
+    for notebook_name, notebook in report['notebooks'].items():
+        parts.append(f'<h2>{html.escape(notebook_name)}</h2>')
+        parts.append(f'<p>Total wall time: {notebook["total_wall_time"]:.2f}s</p>')
+        parts.append('<table border="1"><tr>' + ''.join(f'<th>{value}</th>' for value in _TABLE_HEADER) + '</tr>')
+        for row in _table_rows(notebook):
+            row[1] = f'<code>{html.escape(row[1])}</code>'
+            parts.append('<tr>' + ''.join(f'<td>{value}</td>' for value in row) + '</tr>')
+        parts.append('</table>')
+    parts.append('</body></html>')
+    return '\n'.join(parts) + '\n'
+
+
+def write_table(report: Dict[str, Any], out_path: str):
+    if out_path.endswith(('.html', '.htm')):
+        content = report_to_html(report)
+    else:
+        content = report_to_markdown(report)
+    with open(out_path, 'w', encoding='utf8') as f:
+        f.write(content)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+',
+                        help='Notebooks or folders of notebooks to profile')
+    parser.add_argument('-o', '--output', default='notebook-profile.json',
+                        help='Path of the JSON report')
+    parser.add_argument('-t', '--table', default=None,
+                        help='Also write the report as a table, HTML if the path ends in .html, otherwise Markdown')
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help='JSON report of a previous run, exit with an error if any cell regressed from it')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Fraction of the baseline wall time or memory increase a cell may grow by '
+                             'before it is a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.5,
+                        help='Wall time increases smaller than this many seconds are never regressions')
+    parser.add_argument('--min-memory-mb', type=float, default=50,
+                        help='Memory increases smaller than this many MB are never regressions')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Stop a notebook when a cell runs longer than this many seconds')
+    parser.add_argument('--kernel', default='python3',
+                        help='Name of the jupyter kernel to execute the notebooks with')
+    args = parser.parse_args()
+
+    report = profile_notebooks(args.paths, kernel_name=args.kernel, timeout=args.timeout)
+    with open(args.output, 'w', encoding='utf8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote report to {args.output}')
+    if args.table:
+        write_table(report, args.table)
+        print(f'Wrote table to {args.table}')
+
+    exit_code = 0
+    if report_has_failures(report):
+        print('Not all notebooks ran to completion', file=sys.stderr)
+        exit_code = 1
+    if args.compare:
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)
+        regressions = compare_reports(
+            report, baseline, threshold=args.threshold, min_seconds=args.min_seconds,
+            min_memory_mb=args.min_memory_mb
+        )
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        if regressions:
+            exit_code = 1
+        else:
+            print(f'No regressions from {args.compare}')
+    sys.exit(exit_code)
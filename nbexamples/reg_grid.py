@@ -0,0 +1,185 @@
+"""Run a grid of regression specifications on a process pool.
+Used in Additional Research Tools and benchmarked in benchmarks/regression_grid.py.
+
+reg_for_each_xvar_set_and_produce_summary takes the same arguments and gives the same models and
+summary table as regtools.reg_for_each_xvar_set_and_produce_summary, which fits each set of x variables
+one after another. Here the specifications are fitted by a pool of processes. The data is sent to
+each process once rather than with every specification: on Linux the processes are forked, so they
+share the memory of the data with this process until it is modified, elsewhere the data is pickled
+once per process. Models come back in the order of xvars_list however long each takes to fit.
+
+Each fitted model, including its data, is pickled back to this process, which takes a few hundredths
+of a second per hundred thousand rows. The pool pays off when the fits take longer than that: many
+specifications, clustered standard errors, fixed effects or quantile regressions, and more than one core.
+"""
+import inspect
+import multiprocessing
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from regtools.chooser import any_reg
+from regtools.order import convert_regressor_order_for_diff, convert_regressor_order_for_lags
+from regtools.summarize import produce_summary
+
+# One regression: reg_type, yvar, xvars and the keyword arguments for regtools.chooser.any_reg
+Spec = Tuple[str, str, List[str], Dict[str, Any]]
+
+# Values of reg_type for which regtools runs a difference regression
+DIFF_REG_TYPES = ('diff', 'difference', 'diff_reg', 'diff reg', 'difference reg', 'difference regression')
+
+# Data for the specifications, set in each process of the pool when it starts
+_design_df: Optional[pd.DataFrame] = None
+
+
+def _strings_in(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings_in(item)
+
+
+def design_df(df: pd.DataFrame, yvar: str, xvars_list: Sequence[Sequence[str]], **reg_kwargs) -> pd.DataFrame:
+    """
+    The part of df the regressions use: the y and x variables and any column named in reg_kwargs,
+    such as fixed effects, cluster, entity and time variables, without the rows missing yvar, which
+    every regression drops. Lags and differences are calculated from the rows and columns of df
+    before dropping missing values, so with those, df is used as is
+    """
+    if reg_kwargs.get('num_lags') or reg_kwargs.get('reg_type') in DIFF_REG_TYPES:
+        return df
+    columns = [yvar] + [xvar for xvars in xvars_list for xvar in xvars] + list(_strings_in(list(reg_kwargs.values())))
+    columns = [col for col in dict.fromkeys(columns) if col in df.columns]
+    return df.loc[df[yvar].notna(), columns]
+
+
+def _per_model(value: Any, num_models: int, name: str) -> List[Any]:
+    """
+    value for each model: a list with one item per model as is, otherwise a single item or a list of
+    one item repeated for every model, as regtools.reg_for_each_xvar_set does for fe and interaction_tuples
+    """
+    if isinstance(value, list) and len(value) == num_models:
+        return value
+    if not isinstance(value, list):
+        value = [value]
+    if len(value) > 1:
+        raise ValueError(f'Incorrect shape of items for {name} passed. Got {len(value)} items, '
+                         f'was expecting {num_models}')
+    return [value[0]] * num_models
+
+
+def _regressor_order(regressor_order: Sequence[str], reg_kwargs: Dict[str, Any]) -> List[str]:
+    """
+    regressor_order with the names regtools gives lagged and differenced variables, as
+    regtools.reg_for_each_xvar_set_and_produce_summary does
+    """
+    order = list(regressor_order)
+    if 'num_lags' in reg_kwargs or 'lag_tuple' in reg_kwargs:
+        order = convert_regressor_order_for_lags(order, reg_kwargs)
+    if reg_kwargs.get('reg_type') in DIFF_REG_TYPES:
+        order = convert_regressor_order_for_diff(order, reg_kwargs)
+    return order
+
+
+def _set_design_df(df: pd.DataFrame) -> None:
+    global _design_df
+    _design_df = df
+
+
+class _Evaluated:
+    """
+    Function which returns an already calculated value
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self) -> Any:
+        return self.value
+
+
+def _is_local_function(value: Any) -> bool:
+    return inspect.isfunction(value) and '<locals>' in value.__qualname__
+
+
+def _picklable(result: Any) -> Any:
+    """
+    Local functions can't be pickled. regtools sets some on clustered results (e.g. cov_params and
+    summary) and linearmodels results use one for the robust F-statistic. They take no arguments,
+    so call them here and store the values, so the result can be sent back from the pool
+    """
+    # statsmodels results are wrapped
+    for obj in (result, getattr(result, '_results', None)):
+        if obj is None or not hasattr(obj, '__dict__'):
+            continue
+        for name, value in list(vars(obj).items()):
+            if _is_local_function(value) and not inspect.signature(value).parameters:
+                setattr(obj, name, _Evaluated(value()))
+    return result
+
+
+def _fit_spec(spec: Spec) -> Any:
+    reg_type, yvar, xvars, reg_kwargs = spec
+    return any_reg(reg_type, _design_df, yvar, xvars, **reg_kwargs)
+
+
+def _fit_spec_in_pool(spec: Spec) -> Any:
+    return _picklable(_fit_spec(spec))
+
+
+def reg_for_each_xvar_set(df: pd.DataFrame, yvar: str, xvars_list: Sequence[Sequence[str]],
+                          reg_type: str = 'reg', processes: Optional[int] = None, **reg_kwargs) -> List[Any]:
+    """
+    Same as regtools.reg_for_each_xvar_set with the regressions fitted on a process pool
+
+    :param processes: number of processes, default the number of CPUs. 1 fits in this process
+    :return: a list of fitted regressions in the order of xvars_list
+    """
+    fe = _per_model(reg_kwargs.pop('fe', None), len(xvars_list), 'fixed effects')
+    interaction_tuples = _per_model(reg_kwargs.pop('interaction_tuples', [None]), len(xvars_list),
+                                    'interaction tuples')
+    specs = [
+        (reg_type, yvar, list(xvars), dict(reg_kwargs, fe=fe[i], interaction_tuples=interaction_tuples[i]))
+        for i, xvars in enumerate(xvars_list)
+    ]
+    data = design_df(df, yvar, xvars_list, reg_type=reg_type, fe=fe, interaction_tuples=interaction_tuples,
+                     **reg_kwargs)
+    processes = min(processes or os.cpu_count() or 1, len(specs))
+    if processes <= 1:
+        _set_design_df(data)
+        try:
+            return [_fit_spec(spec) for spec in specs]
+        finally:
+            _set_design_df(None)
+
+    context = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
+    with context.Pool(processes, initializer=_set_design_df, initargs=(data,)) as pool:
+        # One specification at a time, as some take much longer than others
+        return pool.map(_fit_spec_in_pool, specs, chunksize=1)
+
+
+def reg_for_each_xvar_set_and_produce_summary(df: pd.DataFrame, yvar: str, xvars_list: Sequence[Sequence[str]],
+                                              robust: bool = True,
+                                              cluster: Union[bool, str, Sequence[str]] = False,
+                                              stderr: bool = False, t_stats: bool = True,
+                                              fe: Optional[Union[str, Sequence[Optional[str]]]] = None,
+                                              float_format: str = '%0.2f', suppress_other_regressors: bool = False,
+                                              regressor_order: Sequence[str] = tuple(),
+                                              processes: Optional[int] = None, **other_reg_kwargs):
+    """
+    Same as regtools.reg_for_each_xvar_set_and_produce_summary with the regressions fitted on a
+    process pool, see its documentation for the arguments
+
+    :param processes: number of processes, default the number of CPUs. 1 fits in this process
+    :return: a tuple of (reg_list, summary) where reg_list is a list of fitted regression models,
+        and summary is a single dataframe of results
+    """
+    reg_list = reg_for_each_xvar_set(
+        df, yvar, xvars_list, robust=robust, cluster=cluster, fe=fe, processes=processes, **other_reg_kwargs
+    )
+    regressor_order = _regressor_order(regressor_order, other_reg_kwargs)
+    summ = produce_summary(reg_list, stderr=stderr, t_stats=t_stats, float_format=float_format,
+                           regressor_order=regressor_order, suppress_other_regressors=suppress_other_regressors)
+    return reg_list, summ
@@ -0,0 +1,111 @@
+"""Generate synthetic firm x date and firm x date x intraday period panels for the examples and benchmarks.
+Every column is built with numpy operations on whole arrays, so tens of millions of rows take seconds.
+
+firm_date_panel has the shape of df in Data Management in Python (Company, State, Date, Return), and
+with firm_format='{:06d}' or a renamed firm column, of the GVKEY and PERMNO panels in Additional
+Research Tools. intraday_panel has the shape of intraday_df (Company, Datetime, Price).
+"""
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+STATES = ['FL', 'GA', 'PA', 'NY', 'CA', 'TX', 'OH', 'IL', 'NC', 'MI']
+
+Firms = Union[int, Sequence[str]]
+
+
+def trading_days(start: str = '2000-01-03', num_days: int = 250, holidays: Optional[Sequence] = None,
+                 weekmask: str = 'Mon Tue Wed Thu Fri') -> pd.DatetimeIndex:
+    """
+    Consecutive trading days, skipping days not in weekmask and holidays.
+    For other frequencies, pass any dates such as pd.date_range(..., freq='MS') to the panel functions
+    """
+    return pd.bdate_range(start, periods=num_days, freq='C', holidays=list(holidays or []), weekmask=weekmask)
+
+
+def firm_names(num_firms: int, firm_format: str = 'Firm {}') -> np.ndarray:
+    return np.array([firm_format.format(i) for i in range(num_firms)], dtype=object)
+
+
+def _firms_array(firms: Firms, firm_format: str) -> np.ndarray:
+    if isinstance(firms, (int, np.integer)):
+        return firm_names(int(firms), firm_format)
+    return np.asarray(firms, dtype=object)
+
+
+def _dates_index(dates: Optional[Sequence]) -> pd.DatetimeIndex:
+    return trading_days() if dates is None else pd.DatetimeIndex(dates)
+
+
+def _panel_with_missing(columns: Dict[str, np.ndarray], value_col: str, rng: np.random.Generator,
+                        missing_rows: float, missing_values: float) -> pd.DataFrame:
+    if missing_values:
+        columns[value_col][rng.random(len(columns[value_col])) < missing_values] = np.nan
+    if missing_rows:
+        keep = rng.random(len(columns[value_col])) >= missing_rows
+        columns = {col: values[keep] for col, values in columns.items()}
+    return pd.DataFrame(columns)
+
+
+def firm_date_panel(firms: Firms = 100, dates: Optional[Sequence] = None, states: Sequence[str] = STATES,
+                    mean_return: float = 0.01, return_std: float = 0.05, missing_rows: float = 0,
+                    missing_values: float = 0, seed: Optional[int] = 0,
+                    firm_format: str = 'Firm {}') -> pd.DataFrame:
+    """
+    Company, State, Date, Return panel with one row per firm and date, sorted by Company and Date
+
+    :param firms: number of firms, named using firm_format, or the firm names
+    :param dates: default 250 trading days from 2000-01-03
+    :param states: each firm gets one of these at random for all of its rows
+    :param missing_rows: fraction of rows to drop at random, leaving gaps in the dates of each firm
+    :param missing_values: fraction of Return values to set missing at random
+    :param seed: for numpy's random generator, None for a different panel every time
+    """
+    rng = np.random.default_rng(seed)
+    firm_array = _firms_array(firms, firm_format)
+    date_index = _dates_index(dates)
+    num_rows = len(firm_array) * len(date_index)
+    columns = {
+        'Company': np.repeat(firm_array, len(date_index)),
+        'State': np.repeat(rng.choice(np.asarray(states, dtype=object), size=len(firm_array)), len(date_index)),
+        'Date': np.tile(date_index.values, len(firm_array)),
+        'Return': rng.normal(mean_return, return_std, size=num_rows),
+    }
+    return _panel_with_missing(columns, 'Return', rng, missing_rows, missing_values)
+
+
+def intraday_panel(firms: Firms = 100, dates: Optional[Sequence] = None, periods_per_day: int = 13,
+                   freq: str = '30min', open_time: str = '9:30', max_price: float = 100,
+                   missing_rows: float = 0, missing_values: float = 0, seed: Optional[int] = 0,
+                   firm_format: str = 'Firm {}') -> pd.DataFrame:
+    """
+    Company, Datetime, Price panel with one row per firm, date and intraday period, sorted by
+    Company and Datetime. Periods are at the end of each interval, so the defaults give 10:00 to 16:00
+
+    :param firms: number of firms, named using firm_format, or the firm names
+    :param dates: default 250 trading days from 2000-01-03
+    :param periods_per_day: number of intervals of length freq after open_time on each date
+    :param missing_rows: fraction of rows to drop at random, leaving gaps in the periods of each firm
+    :param missing_values: fraction of Price values to set missing at random
+    :param seed: for numpy's random generator, None for a different panel every time
+    """
+    rng = np.random.default_rng(seed)
+    firm_array = _firms_array(firms, firm_format)
+    date_index = _dates_index(dates)
+    offsets = pd.timedelta_range(pd.Timedelta(f'{open_time}:00') + pd.Timedelta(freq), periods=periods_per_day,
+                                 freq=freq)
+    datetimes = (date_index.normalize().values[:, None] + offsets.values[None, :]).ravel()
+    columns = {
+        'Company': np.repeat(firm_array, len(datetimes)),
+        'Datetime': np.tile(datetimes, len(firm_array)),
+        'Price': rng.random(len(firm_array) * len(datetimes)) * max_price,
+    }
+    return _panel_with_missing(columns, 'Price', rng, missing_rows, missing_values)
+
+
+def num_firms_for_rows(rows: int, rows_per_firm: int) -> int:
+    """
+    Smallest number of firms giving at least rows rows, with rows_per_firm rows for each firm
+    """
+    return max(-(-rows // rows_per_firm), 1)
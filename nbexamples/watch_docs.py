@@ -0,0 +1,238 @@
+"""Rebuild the docs pages of a notebook whenever it is saved.
+Usage: python watch_docs.py <folder> [--out-folder ../_examples] [--docs-folder ../docsrc] [--stored-outputs]
+Waits for notebooks in the folder to change using the file change notifications of the operating
+system. Once the saves stop for a moment, only the changed notebooks are converted to gallery
+examples (incremental conversion with ipynb_to_gallery), then Sphinx builds only the gallery pages
+whose examples changed, with sphinx-gallery executing only those examples. The time taken by each
+stage is printed after every rebuild. This updates an existing build, so run make html first,
+or use make watch in docsrc which does both.
+Dependencies:
+watchdog: install using `pip install watchdog`, otherwise the folder is polled for changes
+sphinx, sphinx-gallery: the docs requirements
+"""
+import hashlib
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from ipynb_to_gallery import BACKENDS, DEFAULT_BACKEND, NotebookConversionError, convert_all_in_folder_to_gallery
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    # Without watchdog the folder is polled
+    Observer = None
+    FileSystemEvent = FileSystemEventHandler = object
+
+# Seconds without another save before rebuilding, as editors and Jupyter may write a notebook several times per save
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+
+# How often to check the folder for changes without watchdog
+POLL_SECONDS = 0.5
+
+# sphinx_gallery_conf gallery_dirs in docsrc/source/conf.py
+GALLERY_DIR = 'auto_examples'
+
+# Events which change a notebook. Others such as opening one, as the conversion does, are ignored
+_CHANGE_EVENT_TYPES = {'created', 'modified', 'moved', 'deleted'}
+
+DEFAULT_DOCS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docsrc')
+
+
+def _is_notebook(path: str) -> bool:
+    return path.lower().endswith('.ipynb') and '.ipynb_checkpoints' not in path
+
+
+class _NotebookEventHandler(FileSystemEventHandler):
+    """
+    Puts the path of every changed notebook on a queue
+    """
+
+    def __init__(self, changes: queue.Queue):
+        super().__init__()
+        self.changes = changes
+
+    def on_any_event(self, event: FileSystemEvent):
+        if event.is_directory or event.event_type not in _CHANGE_EVENT_TYPES:
+            return
+        # Jupyter saves to a temporary file and moves it over the notebook
+        for path in (event.src_path, getattr(event, 'dest_path', '')):
+            if _is_notebook(path):
+                self.changes.put(os.path.abspath(path))
+
+
+def _notebook_states(folder: str) -> Dict[str, Tuple[int, int]]:
+    states = {}
+    for path, folders, files in os.walk(folder):
+        for file in files:
+            file_path = os.path.abspath(os.path.join(path, file))
+            if _is_notebook(file_path):
+                stat = os.stat(file_path)
+                states[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return states
+
+
+def _poll_for_changes(folder: str, changes: queue.Queue, stop: threading.Event):
+    states = _notebook_states(folder)
+    while not stop.wait(POLL_SECONDS):
+        new_states = _notebook_states(folder)
+        for path in set(states) | set(new_states):
+            if states.get(path) != new_states.get(path):
+                changes.put(path)
+        states = new_states
+
+
+def _next_changes(changes: queue.Queue, debounce: float) -> Tuple[Set[str], float]:
+    """
+    Waits for a notebook to change, then until none has changed for debounce seconds
+
+    :return: the changed notebooks and the time of the first change, from time.perf_counter
+    """
+    paths = {changes.get()}
+    first_change_time = time.perf_counter()
+    while True:
+        try:
+            paths.add(changes.get(timeout=debounce))
+        except queue.Empty:
+            return paths, first_change_time
+
+
+def _example_hashes(out_folder: str) -> Dict[str, str]:
+    """
+    Content hash of every gallery example in out_folder by its path relative to out_folder
+    """
+    hashes = {}
+    for path, folders, files in os.walk(out_folder):
+        for file in files:
+            if not file.endswith('.py') or file == '__init__.py':
+                continue
+            file_path = os.path.join(path, file)
+            with open(file_path, 'rb') as f:
+                hashes[os.path.relpath(file_path, out_folder)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def sphinx_build_command(docs_folder: str, filenames: Optional[List[str]] = None) -> List[str]:
+    """
+    sphinx-build command updating the same build as make html in docs_folder. With filenames,
+    only those pages are written, otherwise every page which changed
+    """
+    return [
+        sys.executable, '-m', 'sphinx', '-b', 'html', '-d', os.path.join('build', 'doctrees'), '-q',
+        'source', os.path.join('build', 'html'), *(filenames or [])
+    ]
+
+
+class RebuildTimes(NamedTuple):
+    convert: float
+    build: float
+    pages: List[str]
+    succeeded: bool
+
+
+def rebuild(folder: str, out_folder: Optional[str] = None, docs_folder: str = DEFAULT_DOCS_FOLDER,
+            backend: str = DEFAULT_BACKEND, stored_outputs: bool = False) -> RebuildTimes:
+    """
+    Converts the notebooks in folder which changed since they were last converted and builds the
+    gallery pages of the examples which changed as a result
+
+    :return: seconds taken by the conversion and by Sphinx, the gallery pages built, relative to
+        the gallery folder, and whether both succeeded
+    """
+    out_folder = out_folder or folder
+    start_time = time.perf_counter()
+    examples_before = _example_hashes(out_folder)
+    try:
+        convert_all_in_folder_to_gallery(folder, out_folder, incremental=True, backend=backend,
+                                         stored_outputs=stored_outputs)
+        converted = True
+    except NotebookConversionError as e:
+        print(e, file=sys.stderr)
+        converted = False
+    examples_after = _example_hashes(out_folder)
+    convert_seconds = time.perf_counter() - start_time
+
+    changed = sorted(
+        example for example in set(examples_before) | set(examples_after)
+        if examples_before.get(example) != examples_after.get(example)
+    )
+    pages = [os.path.splitext(example)[0] for example in changed]
+    if not pages:
+        return RebuildTimes(convert_seconds, 0, pages, converted)
+
+    page_files = [os.path.join('source', GALLERY_DIR, page + '.rst') for page in pages]
+    filenames: Optional[List[str]] = page_files
+    if not all(os.path.exists(os.path.join(docs_folder, filename)) for filename in page_files):
+        # Examples were added or removed, which also changes the gallery index, so build every changed page
+        filenames = None
+    start_time = time.perf_counter()
+    built = subprocess.run(sphinx_build_command(docs_folder, filenames), cwd=docs_folder).returncode == 0
+    build_seconds = time.perf_counter() - start_time
+    return RebuildTimes(convert_seconds, build_seconds, pages, converted and built)
+
+
+def watch(folder: str, out_folder: Optional[str] = None, docs_folder: str = DEFAULT_DOCS_FOLDER,
+          debounce: float = DEFAULT_DEBOUNCE_SECONDS, backend: str = DEFAULT_BACKEND,
+          stored_outputs: bool = False):
+    """
+    Runs rebuild after every change to the notebooks in folder until interrupted, printing the
+    time from the first save to the pages being built, and the time taken by each stage
+    """
+    changes: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    if Observer is not None:
+        observer = Observer()
+        observer.schedule(_NotebookEventHandler(changes), folder, recursive=True)
+        observer.start()
+    else:
+        print('watchdog is not installed, polling for changes')
+        observer = threading.Thread(target=_poll_for_changes, args=(folder, changes, stop), daemon=True)
+        observer.start()
+
+    print(f'Watching {folder} for changes to notebooks, press Ctrl+C to stop')
+    try:
+        while True:
+            notebooks, saved_time = _next_changes(changes, debounce)
+            waited = time.perf_counter() - saved_time
+            names = ', '.join(sorted(os.path.basename(path) for path in notebooks))
+            print(f'Changed: {names}')
+            times = rebuild(folder, out_folder, docs_folder, backend=backend, stored_outputs=stored_outputs)
+            total = time.perf_counter() - saved_time
+            pages = ', '.join(times.pages) or 'no gallery pages changed'
+            status = 'Rebuilt' if times.succeeded else 'Failed to rebuild'
+            print(
+                f'{status} {pages} {total:.1f}s after the save: {waited:.1f}s waiting for saves to stop, '
+                f'{times.convert:.1f}s converting, {times.build:.1f}s building'
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        if Observer is not None:
+            observer.stop()
+        observer.join()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('folder',
+                        help='Folder of notebooks to watch')
+    parser.add_argument('-o', '--out-folder', default=None,
+                        help='Output folder for Sphinx Gallery py files, default in same folder')
+    parser.add_argument('-d', '--docs-folder', default=DEFAULT_DOCS_FOLDER,
+                        help='Folder with the Sphinx source and build folders and Makefile')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE_SECONDS,
+                        help='Seconds without another change before rebuilding')
+    parser.add_argument('-b', '--backend', default=DEFAULT_BACKEND, choices=list(BACKENDS),
+                        help='Markdown to rst converter, see ipynb_to_gallery.py')
+    parser.add_argument('-s', '--stored-outputs', action='store_true',
+                        help='Render the outputs saved in the notebooks into the examples, see ipynb_to_gallery.py')
+    args = parser.parse_args()
+    watch(args.folder, args.out_folder, args.docs_folder, debounce=args.debounce, backend=args.backend,
+          stored_outputs=args.stored_outputs)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules under test are scripts in nbexamples and docsrc rather than an installed package
+for folder in ('docsrc', 'nbexamples'):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', folder)))
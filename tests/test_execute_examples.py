@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+pytest.importorskip('sphinx')
+pytest.importorskip('sphinx_gallery')
+pytest.importorskip('matplotlib')
+
+from compare_parallel_build import compare_builds
+from execute_examples import execute_examples, read_config, split_into_groups, stale_examples
+
+CONF = '''
+import random
+
+def seed_random_numbers(gallery_conf, fname):
+    import numpy as np
+
+    random.seed(0)
+    np.random.seed(0)
+
+extensions = ['sphinx_gallery.gen_gallery']
+master_doc = 'index'
+sphinx_gallery_conf = {
+    'examples_dirs': '../../examples',
+    'gallery_dirs': 'auto_examples',
+    'reset_modules': ('matplotlib', seed_random_numbers),
+}
+'''
+
+EXAMPLES = {
+    'plot_numbers.py': 'import numpy as np\n\nprint(np.random.normal(size=3))',
+    'plot_more_numbers.py': 'import random\n\nprint([random.random() for _ in range(3)])',
+    'plot_figure.py': 'import matplotlib.pyplot as plt\nimport numpy as np\n\nplt.plot(np.random.normal(size=10))',
+    os.path.join('sub', 'plot_sub_numbers.py'): 'import numpy as np\n\nprint(np.random.randint(10, size=5))',
+    # Not matching the default filename_pattern, so not executed
+    'not_executed.py': 'print(1)',
+}
+
+
+def _write_docs(folder) -> str:
+    """
+    Small sphinx-gallery project of examples using random numbers and a figure, returns the docs folder
+    """
+    docs_folder = os.path.join(str(folder), 'docs')
+    os.makedirs(os.path.join(docs_folder, 'source'))
+    with open(os.path.join(docs_folder, 'source', 'conf.py'), 'w') as f:
+        f.write(CONF)
+    with open(os.path.join(docs_folder, 'source', 'index.rst'), 'w') as f:
+        f.write('Docs\n====\n\n.. toctree::\n\n   auto_examples/index\n')
+    examples_folder = os.path.join(str(folder), 'examples')
+    for readme_folder, title in [(examples_folder, 'Examples'), (os.path.join(examples_folder, 'sub'), 'More')]:
+        os.makedirs(readme_folder)
+        with open(os.path.join(readme_folder, 'README.txt'), 'w') as f:
+            f.write(f'{title}\n{"=" * len(title)}\n')
+    for name, code in EXAMPLES.items():
+        title = os.path.basename(name)
+        with open(os.path.join(examples_folder, name), 'w') as f:
+            f.write(f'"""\n{title}\n{"=" * len(title)}\n"""\n{code}\n')
+    return docs_folder
+
+
+def test_parallel_build_same_html_as_serial(tmp_path, monkeypatch):
+    monkeypatch.chdir(_write_docs(tmp_path))
+    assert compare_builds('2', 'build', 'source') == 0
+
+
+def test_only_stale_examples_executed(tmp_path, monkeypatch):
+    monkeypatch.chdir(_write_docs(tmp_path))
+    config = read_config('source')
+    stale = stale_examples(config, 'source')
+    assert [(os.path.relpath(examples_dir), gallery_dir) for examples_dir, gallery_dir in stale] == [
+        (os.path.join('..', 'examples'), 'auto_examples')
+    ]
+    stale_names = [os.path.relpath(path, os.path.join('..', 'examples')) for path in list(stale.values())[0]]
+    assert sorted(stale_names) == sorted(name for name in EXAMPLES if name != 'not_executed.py')
+
+    assert execute_examples(2, 'source') == 4
+    assert os.path.exists(os.path.join('source', 'auto_examples', 'images', 'sphx_glr_plot_figure_001.png'))
+    assert stale_examples(config, 'source') == {}
+
+    with open(os.path.join('..', 'examples', 'plot_numbers.py'), 'a') as f:
+        f.write("print('edited')\n")
+    stale = stale_examples(config, 'source')
+    assert [os.path.basename(path) for paths in stale.values() for path in paths] == ['plot_numbers.py']
+
+
+def test_split_into_groups_balances_sizes(tmp_path):
+    paths = []
+    for name, size in [('a', 50), ('b', 40), ('c', 30), ('d', 20), ('e', 10)]:
+        path = tmp_path / f'{name}.py'
+        path.write_text('x' * size)
+        paths.append(str(path))
+    groups = split_into_groups(paths, 2)
+    names = [[os.path.basename(path) for path in group] for group in groups]
+    assert names == [['a.py', 'd.py', 'e.py'], ['b.py', 'c.py']]
+    assert len(split_into_groups(paths[:1], 4)) == 1
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('linearmodels')
+smf = pytest.importorskip('statsmodels.formula.api')
+
+from fixed_effects import absorbed_ols
+from synthetic_panels import firm_date_panel
+
+
+@pytest.fixture(scope='module')
+def df():
+    df = firm_date_panel(30, dates=firm_date_panel(1)['Date'].iloc[:20], missing_rows=0.1)
+    rng = np.random.default_rng(1)
+    df['X1'] = rng.normal(size=len(df))
+    df['X2'] = df['X1'] + rng.normal(size=len(df))
+    df['Return'] += df['X1'] + rng.normal(size=len(df))
+    return df
+
+
+@pytest.mark.parametrize('fe', [['Company'], ['Company', 'Date']])
+@pytest.mark.parametrize('cov_type, cluster', [('nonrobust', None), ('HC1', None), ('cluster', 'Company')])
+def test_same_as_dummy_variables(df, fe, cov_type, cluster):
+    result = absorbed_ols(df, 'Return', ['X1', 'X2'], fe, cluster=cluster, cov_type=cov_type)
+    formula = 'Return ~ X1 + X2 + ' + ' + '.join(f'C({col})' for col in fe)
+    cov_kwds = {'groups': df['Company'].factorize()[0]} if cluster else None
+    expected = smf.ols(formula, data=df).fit(cov_type=cov_type, cov_kwds=cov_kwds)
+    np.testing.assert_allclose(result.params, expected.params[['X1', 'X2']])
+    np.testing.assert_allclose(result.std_errors, expected.bse[['X1', 'X2']])
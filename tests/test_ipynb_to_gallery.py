@@ -0,0 +1,127 @@
+import json
+import os
+
+import pytest
+
+import ipynb_to_gallery
+from ipynb_to_gallery import NotebookConversionError, convert_all_in_folder_to_gallery, convert_ipynb_to_gallery
+
+pytest.importorskip('pypandoc')
+
+NBEXAMPLES_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'nbexamples')
+NOTEBOOKS = ['Data Management in Python.ipynb', 'Additional Research Tools.ipynb']
+
+
+def _read_outputs(out_path: str) -> dict:
+    if os.path.isfile(out_path):
+        with open(out_path) as f:
+            return {'': f.read()}
+    contents = {}
+    for file in sorted(os.listdir(out_path)):
+        with open(os.path.join(out_path, file)) as f:
+            contents[file] = f.read()
+    return contents
+
+
+def _convert_both_ways(file_path: str, tmp_path) -> tuple:
+    outputs = []
+    for batch in (False, True):
+        # Same name both ways, as split notebooks link to their folder
+        os.makedirs(tmp_path / f'batch_{batch}')
+        out_path = str(tmp_path / f'batch_{batch}' / 'out')
+        convert_ipynb_to_gallery(file_path, out_path, batch=batch)
+        outputs.append(_read_outputs(out_path))
+    return tuple(outputs)
+
+
+@pytest.mark.parametrize('notebook', NOTEBOOKS)
+def test_batched_conversion_matches_per_cell(notebook, tmp_path):
+    per_cell, batched = _convert_both_ways(os.path.join(NBEXAMPLES_FOLDER, notebook), tmp_path)
+    assert per_cell
+    assert batched == per_cell
+
+
+def _markdown_cell(source: str) -> dict:
+    return {'cell_type': 'markdown', 'metadata': {}, 'source': source}
+
+
+def test_batched_conversion_with_sentinel_text_in_cell(tmp_path):
+    cells = [
+        _markdown_cell('# Title\n\nSome *intro* text'),
+        _markdown_cell('ipynbtogallerycellbreak'),
+        _markdown_cell('Text mentioning ipynbtogallerycellbreak00000000000000000000000000000000 inline'),
+        {'cell_type': 'code', 'metadata': {}, 'source': 'a = 1', 'outputs': [], 'execution_count': 1},
+        _markdown_cell('\n\nipynbtogallerycellbreak\n\n- a list\n- after it'),
+        _markdown_cell('## Section\n\nLast cell'),
+    ]
+    file_path = tmp_path / 'sentinel.ipynb'
+    file_path.write_text(json.dumps({'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 4}))
+    per_cell, batched = _convert_both_ways(str(file_path), tmp_path)
+    assert 'ipynbtogallerycellbreak' in per_cell['']
+    assert batched == per_cell
+
+
+def test_split_notebook_links_point_at_section_pages(tmp_path):
+    cells = [
+        _markdown_cell('# Title\n\n- [First](#First-Section)\n- [`second`](#second)\n- [Elsewhere](#elsewhere)'),
+        {'cell_type': 'code', 'metadata': {}, 'source': 'a = 1', 'outputs': [], 'execution_count': 1},
+        _markdown_cell('## First Section\n\nSee [the second](#second) and [this one](#first-section)'),
+        _markdown_cell('## `second`\n\nLast cell'),
+    ]
+    file_path = tmp_path / 'links.ipynb'
+    file_path.write_text(json.dumps({'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 4}))
+    out_path = str(tmp_path / 'links')
+    convert_ipynb_to_gallery(str(file_path), out_path, split_sections=True)
+    outputs = _read_outputs(out_path)
+    assert '<links/01_first_section.html>' in outputs['README.rst']
+    assert '<links/02_second.html>' in outputs['README.rst']
+    assert '<#elsewhere>' in outputs['README.rst']
+    assert '<02_second.html>' in outputs['01_first_section.py']
+    assert '<#first-section>' in outputs['01_first_section.py']
+
+
+def _write_notebooks_with_one_broken(folder) -> None:
+    os.makedirs(str(folder))
+    for name, metadata in [('first', {}), ('split', {'ipynb_to_gallery': {'split_sections': True}})]:
+        cells = [_markdown_cell(f'# {name}\n\nIntro'), _markdown_cell('## Section\n\nText')]
+        (folder / f'{name}.ipynb').write_text(
+            json.dumps({'cells': cells, 'metadata': metadata, 'nbformat': 4, 'nbformat_minor': 4})
+        )
+    # Truncated, as when a save was interrupted
+    (folder / 'broken.ipynb').write_text('{"cells": [{"cell_type": "markdown", "metadata": {}, "sour')
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_broken_notebook_reported_with_others_converted(tmp_path, monkeypatch, jobs):
+    # Sub-folders of the output mirror the path of the notebooks folder below the first component
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / 'notebooks'
+    out_folder = tmp_path / 'out'
+    _write_notebooks_with_one_broken(folder)
+    with pytest.raises(NotebookConversionError, match='Failed to convert 1 of 3 notebooks') as exc_info:
+        convert_all_in_folder_to_gallery('notebooks', 'out', incremental=True, jobs=jobs)
+    assert 'broken.ipynb' in str(exc_info.value)
+    assert sorted(os.listdir(str(out_folder))) == ['first.py', 'split']
+    assert sorted(os.listdir(str(out_folder / 'split'))) == ['01_section.py', 'README.rst']
+
+
+def test_incremental_run_does_not_reread_unchanged_notebooks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / 'notebooks'
+    out_folder = tmp_path / 'out'
+    _write_notebooks_with_one_broken(folder)
+    with pytest.raises(NotebookConversionError):
+        convert_all_in_folder_to_gallery('notebooks', 'out', incremental=True)
+
+    read_paths = []
+    read_notebook_metadata = ipynb_to_gallery.read_notebook_metadata
+
+    def record_read(file_path):
+        read_paths.append(os.path.basename(file_path))
+        return read_notebook_metadata(file_path)
+
+    monkeypatch.setattr(ipynb_to_gallery, 'read_notebook_metadata', record_read)
+    with pytest.raises(NotebookConversionError, match='Failed to convert 1 of 1 notebooks'):
+        convert_all_in_folder_to_gallery('notebooks', 'out', incremental=True)
+    assert read_paths == ['broken.ipynb']
+    assert sorted(os.listdir(str(out_folder))) == ['first.py', 'split']
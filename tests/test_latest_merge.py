@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.tseries.offsets import BDay
+
+from latest_merge import latest_rows, left_merge_latest
+from synthetic_panels import firm_date_panel, trading_days
+
+
+def _daily_and_quarterly():
+    daily = firm_date_panel(8, trading_days(num_days=300), firm_format='{:06d}', missing_rows=0.2)
+    daily = daily.rename(columns={'Company': 'GVKEY'})[['GVKEY', 'Date', 'Return']]
+    quarterly = firm_date_panel(10, pd.date_range('1999-07-01', periods=8, freq='QS'), firm_format='{:06d}',
+                                missing_rows=0.3, seed=1)
+    quarterly = quarterly.rename(columns={'Company': 'GVKEY', 'Return': 'Assets'})[['GVKEY', 'Date', 'Assets']]
+    # Keys and dates missing on both sides, and unsorted rows
+    daily.loc[daily.index[::37], 'GVKEY'] = None
+    daily.loc[daily.index[5::41], 'Date'] = pd.NaT
+    quarterly.loc[quarterly.index[3], 'Date'] = pd.NaT
+    return daily.sample(frac=1, random_state=0), quarterly.sample(frac=1, random_state=0)
+
+
+@pytest.mark.parametrize('max_offset', [None, pd.Timedelta(days=30), BDay(20)])
+def test_same_as_pd_utils(max_offset):
+    pd_utils = pytest.importorskip('pd_utils')
+    daily, quarterly = _daily_and_quarterly()
+    # Duplicate right rows give several rows in pd_utils, see test_duplicate_right_rows_use_the_last
+    assert not quarterly.duplicated(['GVKEY', 'Date']).any()
+    pd.testing.assert_frame_equal(
+        left_merge_latest(daily, quarterly, on='GVKEY', max_offset=max_offset),
+        pd_utils.left_merge_latest(daily, quarterly, on='GVKEY', max_offset=max_offset),
+    )
+
+
+def test_same_as_pd_utils_with_int_dates_and_overlapping_columns():
+    pd_utils = pytest.importorskip('pd_utils')
+    df = pd.DataFrame({'Firm': ['a', 'a', 'b', 'b', 'c'], 'Year': [2000, 2003, 2001, 2005, 2001],
+                       'Value': [1, 2, 3, 4, 5]})
+    df2 = pd.DataFrame({'Firm': ['a', 'a', 'b', 'd'], 'Fiscal Year': [1999, 2002, 2002, 2000],
+                        'Value': [10, 20, 30, 40]})
+    kwargs = dict(on='Firm', left_datevar='Year', right_datevar='Fiscal Year', max_offset=2)
+    merged = left_merge_latest(df, df2, **kwargs)
+    expected = pd_utils.left_merge_latest(df, df2, **kwargs)
+    pd.testing.assert_frame_equal(merged.drop(columns='Fiscal Year'), expected.drop(columns='Fiscal Year'))
+    # pd_utils turns int dates into datetimes, here they stay years
+    np.testing.assert_array_equal(merged['Fiscal Year'], [1999, 2002, np.nan, np.nan, np.nan])
+
+
+def test_no_rows_can_match_with_offset():
+    daily, quarterly = _daily_and_quarterly()
+    daily['GVKEY'] = None
+    merged = left_merge_latest(daily, quarterly, on='GVKEY', max_offset=BDay(20))
+    assert len(merged) == len(daily)
+    assert merged['Assets'].isna().all()
+
+
+def test_duplicate_right_rows_use_the_last():
+    df = pd.DataFrame({'Firm': ['a', 'a', 'b'], 'Date': pd.to_datetime(['2000-01-05', '2000-01-02', '2000-01-05'])})
+    df2 = pd.DataFrame({
+        'Firm': ['a', 'b', 'a', 'a'],
+        'Date': pd.to_datetime(['2000-01-03', '2000-01-03', '2000-01-03', '2000-01-01']),
+        'Value': [1.0, 2.0, 3.0, 4.0],
+    })
+    # Row 2 is the last of the two rows of a on the latest date before 2000-01-05
+    np.testing.assert_array_equal(latest_rows(df, df2, 'Firm'), [2, 3, 1])
+    merged = left_merge_latest(df, df2, 'Firm')
+    assert merged['Value'].tolist() == [3.0, 4.0, 2.0]
+    assert merged['Date_y'].tolist() == list(pd.to_datetime(['2000-01-03', '2000-01-01', '2000-01-03']))
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+pytest.importorskip('pyexlatex')
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+
+from latex_build import BuiltPDF, LatexBuild
+
+
+def plot_line(slope, calls):
+    import matplotlib.pyplot as plt
+
+    calls.append(slope)
+    figure, ax = plt.subplots()
+    ax.plot([0, 1], [0, slope])
+    return ax
+
+
+def test_figure_reused_when_key_unchanged_and_rebuilt_when_arguments_change(tmp_path):
+    build = LatexBuild(str(tmp_path / 'build'))
+    calls = []
+    path = build.figure_source('My Figure', plot_line, 1, [], source_filetype='png')
+    assert os.path.exists(path)
+    saved_at = os.path.getmtime(path)
+    os.utime(path, (saved_at - 100, saved_at - 100))
+
+    # A new empty list, so the arguments and the key are the same as the first time
+    assert build.figure_source('My Figure', plot_line, 1, [], source_filetype='png') == path
+    assert os.path.getmtime(path) == saved_at - 100
+    assert build.counts == {'figure saved': 1, 'figure reused': 1}
+
+    assert build.figure_source('My Figure', plot_line, 2, calls, source_filetype='png') == path
+    assert calls == [2]
+    assert os.path.getmtime(path) > saved_at - 100
+    assert build.counts == {'figure saved': 2, 'figure reused': 1}
+
+
+def test_figure_rebuilt_when_file_deleted(tmp_path):
+    build = LatexBuild(str(tmp_path / 'build'))
+    path = build.figure_source('My Figure', plot_line, 1, [], source_filetype='png')
+    os.remove(path)
+    build.figure_source('My Figure', plot_line, 1, [], source_filetype='png')
+    assert os.path.exists(path)
+    assert build.counts == {'figure saved': 2}
+
+
+def test_built_pdf_raises_when_deleted(tmp_path):
+    path = tmp_path / 'document.pdf'
+    path.write_bytes(b'%PDF')
+    pdf = BuiltPDF(str(path))
+    assert pdf._repr_pdf_() == b'%PDF'
+    os.remove(str(path))
+    with pytest.raises(FileNotFoundError):
+        pdf._repr_pdf_()
@@ -0,0 +1,140 @@
+import json
+import os
+from typing import Any, Dict, List, Union
+
+from lint_notebooks import lint_notebook, lint_notebooks
+
+NBEXAMPLES_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'nbexamples')
+
+
+def _markdown_cell(source: str) -> Dict[str, Any]:
+    return {'cell_type': 'markdown', 'metadata': {}, 'source': source}
+
+
+def _write_notebook(tmp_path, *sources: Union[str, Dict[str, Any]], name: str = 'example.ipynb') -> str:
+    """
+    Notebook with a code cell for each source, and cells passed as dicts as they are
+    """
+    cells: List[Dict[str, Any]] = [
+        {'cell_type': 'code', 'metadata': {}, 'source': source, 'outputs': [], 'execution_count': None}
+        if isinstance(source, str) else source
+        for source in sources
+    ]
+    file_path = tmp_path / name
+    file_path.write_text(json.dumps({'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 4}))
+    return str(file_path)
+
+
+def test_example_notebooks_have_no_findings():
+    assert lint_notebooks([NBEXAMPLES_FOLDER]) == []
+
+
+def test_apply_with_python_function(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1.0]})\ndef f(x):\n    return x',
+        'df["a"].apply(f)\ndf["a"].apply("mean")\ndf.applymap(f) # perf: ignore[PERF001]',
+    )
+    assert [(finding.cell, finding.line, finding.code) for finding in lint_notebook(file_path)] == [(1, 1, 'PERF001')]
+
+
+def test_document_rebuilt_only_from_unchanged_content(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pyexlatex as pl\ncontent = ["a"]\npl.Document(content)',
+        'content.append("b")\npl.Document(content)',
+        'pl.Document(content, title="Title")',
+        'content = ["c"]\npl.Document(content)',
+    )
+    assert [(finding.cell, finding.code) for finding in lint_notebook(file_path)] == [(2, 'PERF005')]
+
+
+def _codes(file_path: str, **lint_kwargs) -> List[tuple]:
+    return [(finding.cell, finding.line, finding.code) for finding in lint_notebook(file_path, **lint_kwargs)]
+
+
+def test_map_only_with_functions_from_the_notebook(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1.0]})\ndef f(x):\n    return x',
+        'df["a"].map(f)\ndf["a"].map({1.0: 2.0})\ndf["a"].map(str)\ndf["a"].map(lambda x: x)',
+    )
+    assert _codes(file_path) == [(1, 1, 'PERF001'), (1, 4, 'PERF001')]
+
+
+def test_dataframe_append_but_not_list_append(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1.0]})\npieces = []',
+        'pieces.append(df)\ndf = df.append(df)\nother = df.copy()\nother.append(df)',
+    )
+    assert _codes(file_path) == [(1, 2, 'PERF002'), (1, 4, 'PERF002')]
+
+
+def test_dataframe_from_list_comprehension(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\nfrom pandas import DataFrame as DF\nrows = [{"a": i} for i in range(3)]',
+        'pd.DataFrame(rows)\nDF([{"a": i} for i in range(3)])\npd.DataFrame.from_records(data=(r for r in rows))',
+        'pd.DataFrame({"a": [1, 2]})\nrows = [{"a": 1}]\npd.DataFrame(rows)',
+    )
+    assert _codes(file_path) == [(1, 1, 'PERF003'), (1, 2, 'PERF003'), (1, 3, 'PERF003')]
+
+
+def test_iterrows(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1.0]})',
+        'for i, row in df.iterrows():\n    pass\nfor row in df.itertuples():\n    pass',
+    )
+    assert _codes(file_path) == [(1, 1, 'PERF004')]
+
+
+def test_document_in_loop_or_function(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'from pyexlatex import Document\nfor i in range(3):\n    Document([str(i)])',
+        'def build(content):\n    return Document(content)\nbuild(["a"])',
+    )
+    assert _codes(file_path) == [(0, 3, 'PERF005')]
+
+
+def test_suppression_comments(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1.0]})',
+        'df.apply(lambda x: x) # perf: ignore\n'
+        'df.apply(lambda x: x)  # perf: ignore[PERF002, PERF001]\n'
+        'df.apply(lambda x: x) # perf: ignore[PERF004]\n'
+        'df.apply(\n    lambda x: x,  # perf: ignore[PERF001]\n)',
+        '# perf: ignore-cell\ndf.apply(lambda x: x)\nfor row in df.iterrows():\n    pass',
+        '# perf: ignore-cells is not a cell suppression\ndf.apply(lambda x: x)',
+    )
+    assert _codes(file_path) == [(1, 3, 'PERF001'), (3, 2, 'PERF001')]
+
+
+def test_ignore_codes(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        'import pandas as pd\ndf = pd.DataFrame({"a": [1.0]})\ndf.apply(lambda x: x)\nlist(df.iterrows())',
+    )
+    assert _codes(file_path, ignore=['PERF001']) == [(0, 4, 'PERF004')]
+
+
+def test_findings_have_notebook_and_cell_index_counting_all_cells(tmp_path):
+    file_path = _write_notebook(
+        tmp_path,
+        _markdown_cell('# Title'),
+        '%matplotlib inline\nimport pandas as pd\ndf = pd.DataFrame({"a": [1.0]})',
+        _markdown_cell('Some text'),
+        '',
+        '!ls\ndf.apply(lambda x: x)',
+        name='My Notebook.ipynb',
+    )
+    _write_notebook(tmp_path, 'import pandas as pd\npd.DataFrame([i for i in range(3)])', name='Other.ipynb')
+    findings = lint_notebooks([str(tmp_path)])
+    assert [(finding.notebook, finding.cell, finding.line, finding.code) for finding in findings] == [
+        ('My Notebook.ipynb', 4, 2, 'PERF001'),
+        ('Other.ipynb', 0, 2, 'PERF003'),
+    ]
+    assert str(findings[0]).startswith('My Notebook.ipynb: cell 4, line 2: PERF001')
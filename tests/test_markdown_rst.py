@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from ipynb_to_gallery import compare_backends
+from markdown_rst import markdown_to_rst
+
+pypandoc = pytest.importorskip('pypandoc')
+try:
+    pypandoc.get_pandoc_version()
+except OSError:
+    pytest.skip('pandoc is not installed', allow_module_level=True)
+
+NBEXAMPLES_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'nbexamples')
+
+MARKDOWN_CASES = {
+    'atx headings': '# Title\n\nIntro\n\n## Section\n\n### Sub-section #\n\nText',
+    'setext headings': 'Title\n=====\n\nSection\n-------\n\nText',
+    'emphasis and smart quotes': "Some *emphasis*, **strong** text -- \"quoted\" and 'single'...",
+    'tight bullet list': '- one\n- two\n- three',
+    'loose bullet list': '- one\n\n- two\n\n- three',
+    'nested lists': '- outer\n    - inner one\n    - inner two\n- second outer\n    1. numbered\n    2. numbered',
+    'ordered list': '1. first\n2. second\n3. third',
+    'long ordered list': '\n'.join(
+        f'{number}. item {number} with enough text that it has to wrap onto a continuation line'
+        for number in range(1, 13)
+    ),
+    'ordered list starting at 8': '\n'.join(f'{number}. item ' + 'word ' * 15 for number in range(8, 12)),
+    'fenced code': 'Before\n\n```python\nimport pandas as pd\n\ndf = pd.DataFrame()\n```\n\nAfter',
+    'indented code': 'Before\n\n    x = 1\n    y = 2\n\nAfter',
+    'inline code': 'Use `df.merge` and ``a ` b`` in text',
+    'links': 'A [link](https://example.com) and [*emphasized* link](https://example.com/a "Title") '
+             'and <https://example.com/autolink>',
+    'simple table': '| Name | Value |\n|------|------:|\n| `a` | 1 |\n| *b* | 22 |',
+    'table without outer pipes': 'a | b\n--|--\n1 | 2',
+    'single column table': '| h |\n|---|\n| v |',
+    'table with empty first cell': '| a | b |\n|---|---|\n|  | 2 |',
+    'wide table': '| ' + 'long ' * 20 + '| b |\n|---|---|\n| 1 | [link](https://example.com) |',
+    'table between paragraphs': 'Before\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\nAfter',
+}
+
+
+@pytest.mark.parametrize('md_source', list(MARKDOWN_CASES.values()), ids=list(MARKDOWN_CASES))
+def test_matches_pandoc(md_source):
+    assert markdown_to_rst(md_source) == pypandoc.convert_text(md_source, 'rst', 'md')
+
+
+def test_ordered_list_continuation_lines_line_up():
+    md_source = '\n'.join(f'{number}. ' + 'word ' * 20 for number in range(1, 11))
+    rst_lines = markdown_to_rst(md_source).splitlines()
+    assert rst_lines[0].startswith('1.  word')
+    assert rst_lines[-2].startswith('10. word')
+    continuation_lines = [line for line in rst_lines if not line[0].isdigit()]
+    assert continuation_lines
+    assert all(line.startswith('    word') for line in continuation_lines)
+
+
+def test_backends_agree_on_example_notebooks():
+    assert compare_backends(NBEXAMPLES_FOLDER) == 0
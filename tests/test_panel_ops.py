@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from panel_ops import dense_panel_shift, panel_lag, panel_lead, panel_resample, panel_shift, panel_upsample
+from synthetic_panels import firm_date_panel, intraday_panel, trading_days
+
+DATES = pd.to_datetime(['2000-01-03', '2000-01-04', '2000-01-05', '2000-01-06'])
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    # Firm A is missing 2000-01-05 and firm B starts on 2000-01-04. Rows are not sorted
+    return pd.DataFrame({
+        'Company': ['B', 'A', 'A', 'B', 'A', 'B'],
+        'Date': DATES[[1, 0, 1, 2, 3, 3]],
+        'Return': [0.1, 1.0, 2.0, 0.2, 4.0, 0.3],
+    }, index=[10, 11, 12, 13, 14, 15])
+
+
+@pytest.mark.parametrize('shift', [panel_lag, dense_panel_shift])
+def test_lag(df, shift):
+    lagged = shift(df, 'Return', 'Company', 'Date', calendar=DATES)
+    # The first period of each firm and the date after the gap have no lag, and B never takes the values of A
+    expected = pd.Series([np.nan, np.nan, 1.0, 0.1, np.nan, 0.2], index=df.index, name='Return')
+    pd.testing.assert_series_equal(lagged, expected)
+
+
+def test_lead(df):
+    led = panel_lead(df, 'Return', 'Company', 'Date', calendar=DATES)
+    expected = pd.Series([0.2, 2.0, np.nan, 0.3, np.nan, np.nan], index=df.index, name='Return')
+    pd.testing.assert_series_equal(led, expected)
+
+
+def test_multiple_periods_and_columns(df):
+    df['Doubled'] = df['Return'] * 2
+    lagged = panel_lag(df, ['Return', 'Doubled'], 'Company', 'Date', periods=2, calendar=DATES)
+    expected = pd.DataFrame({
+        'Return': [np.nan, np.nan, np.nan, np.nan, 2.0, 0.1],
+        'Doubled': [np.nan, np.nan, np.nan, np.nan, 4.0, 0.2],
+    }, index=df.index)
+    pd.testing.assert_frame_equal(lagged, expected)
+
+
+def test_dates_not_in_df_are_gaps(df):
+    # Without a calendar, only the dates in df are periods, so drop 2000-01-05 from every firm to
+    # leave no observation on it. Then 2000-01-06 follows 2000-01-04
+    df = df[df['Date'] != DATES[2]]
+    lagged = panel_lag(df, 'Return', 'Company', 'Date')
+    pd.testing.assert_series_equal(lagged, pd.Series([np.nan, np.nan, 1.0, 2.0, 0.1], index=df.index, name='Return'))
+    lagged = panel_lag(df, 'Return', 'Company', 'Date', calendar=DATES)
+    pd.testing.assert_series_equal(
+        lagged, pd.Series([np.nan, np.nan, 1.0, np.nan, np.nan], index=df.index, name='Return')
+    )
+
+
+def test_freq():
+    df = pd.DataFrame({
+        'Company': ['A', 'A', 'A'],
+        'Date': pd.to_datetime(['2000-01-31', '2000-02-29', '2000-04-30']),
+        'Return': [1.0, 2.0, 4.0],
+    })
+    lagged = panel_lag(df, 'Return', 'Company', 'Date', freq='M')
+    pd.testing.assert_series_equal(lagged, pd.Series([np.nan, 1.0, np.nan], name='Return'))
+
+
+def test_duplicate_rows_raise(df):
+    with pytest.raises(ValueError):
+        panel_shift(pd.concat([df, df.iloc[:1]]), 'Return', 'Company', 'Date')
+
+
+@pytest.mark.parametrize('periods', [1, 3, -2])
+def test_matches_dense_panel_shift(periods):
+    df = firm_date_panel(20, missing_rows=0.3, seed=1).sample(frac=1, random_state=1)
+    shifted = panel_shift(df, 'Return', 'Company', 'Date', periods=periods)
+    pd.testing.assert_series_equal(shifted, dense_panel_shift(df, 'Return', 'Company', 'Date', periods=periods))
+    # Every firm has a column of the dense panel of firms by date
+    wide = df.pivot(index='Date', columns='Company', values='Return').shift(periods)
+    expected = wide.to_numpy()[wide.index.get_indexer(df['Date']), wide.columns.get_indexer(df['Company'])]
+    np.testing.assert_array_equal(shifted.to_numpy(), expected)
+
+
+def _intraday_df() -> pd.DataFrame:
+    # Gaps in the periods of each firm, missing prices, and a firm with a single row
+    df = intraday_panel(6, trading_days(num_days=3), missing_rows=0.3, missing_values=0.1, seed=2)
+    single_row = pd.DataFrame({'Company': ['Single'], 'Datetime': [pd.Timestamp('2000-01-04 11:00')], 'Price': [5.0]})
+    df = pd.concat([df, single_row], ignore_index=True).sample(frac=1, random_state=2)
+    return df.set_index('Datetime')
+
+
+@pytest.mark.parametrize('freq', ['1D', '1h', '20min', '7min'])
+@pytest.mark.parametrize('how', ['mean', 'sum', 'count', 'first', 'last', 'max'])
+def test_resample_matches_groupby_resample(freq, how):
+    df = _intraday_df()
+    expected = df.groupby('Company')[['Price']].resample(freq).agg(how)
+    pd.testing.assert_frame_equal(panel_resample(df, 'Company', freq, how=how), expected, check_freq=False)
+
+
+@pytest.mark.parametrize('freq', ['10min', '1h'])
+@pytest.mark.parametrize('method', ['bfill', 'ffill'])
+@pytest.mark.parametrize('limit', [None, 1, 2])
+def test_upsample_matches_groupby_resample(freq, method, limit):
+    df = _intraday_df()
+    expected = getattr(df.groupby('Company').resample(freq), method)(limit=limit)
+    result = panel_upsample(df, 'Company', freq, method=method, limit=limit)
+    pd.testing.assert_frame_equal(result[['Price']], expected[['Price']], check_freq=False)
+
+
+def test_upsample_rejects_duplicate_rows():
+    df = _intraday_df()
+    with pytest.raises(ValueError):
+        panel_upsample(pd.concat([df, df.iloc[:1]]), 'Company', '10min')
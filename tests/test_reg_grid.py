@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+regtools = pytest.importorskip('regtools')
+
+from reg_grid import reg_for_each_xvar_set_and_produce_summary
+from synthetic_panels import firm_date_panel
+
+XVARS_LIST = [['X1'], ['X1', 'X2'], ['X2']]
+
+
+@pytest.fixture(scope='module')
+def df():
+    df = firm_date_panel(20, missing_values=0.05)
+    rng = np.random.default_rng(1)
+    for xvar in ('X1', 'X2'):
+        df[xvar] = rng.normal(size=len(df))
+    return df
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+@pytest.mark.parametrize('reg_kwargs', [
+    dict(cluster=['Company'], robust=False, regressor_order=['X2']),
+    dict(fe=['Company', None, 'Date'], entity_var='Company', time_var='Date', regressor_order=['X2'],
+         suppress_other_regressors=True),
+])
+def test_same_summary_as_regtools(df, processes, reg_kwargs):
+    _, expected = regtools.reg_for_each_xvar_set_and_produce_summary(df, 'Return', XVARS_LIST, **reg_kwargs)
+    _, summ = reg_for_each_xvar_set_and_produce_summary(df, 'Return', XVARS_LIST, processes=processes, **reg_kwargs)
+    assert summ.tables[0].equals(expected.tables[0])
+
+
+def test_fe_for_each_model_must_match_models(df):
+    with pytest.raises(ValueError):
+        reg_for_each_xvar_set_and_produce_summary(df, 'Return', XVARS_LIST, fe=['Company', 'Date'], processes=1)
@@ -0,0 +1,88 @@
+import os
+
+import pandas as pd
+
+from result_cache import ResultCache, call_key
+
+
+def _define_step(body: str):
+    # The same function name and signature with a different body, as after editing a notebook cell
+    namespace: dict = {}
+    exec(f'def step(df, by, scale=1):\n    return {body}', namespace)
+    return namespace['step']
+
+
+def _df() -> pd.DataFrame:
+    return pd.DataFrame({'Company': ['A', 'A', 'B'], 'Return': [0.1, 0.2, 0.3]})
+
+
+def test_key_same_for_positional_keyword_and_default_forms():
+    step = _define_step('df.groupby(by).mean() * scale')
+    key = call_key(step, _df(), 'Company')
+    assert call_key(step, _df(), 'Company', 1) == key
+    assert call_key(step, _df(), by='Company') == key
+    assert call_key(step, df=_df(), by='Company', scale=1) == key
+    assert call_key(step, by='Company', scale=1, df=_df()) == key
+
+
+def test_key_changes_with_data_arguments_and_code():
+    step = _define_step('df.groupby(by).mean() * scale')
+    key = call_key(step, _df(), 'Company')
+
+    changed_df = _df()
+    changed_df.loc[2, 'Return'] = 0.4
+    assert call_key(step, changed_df, 'Company') != key
+    assert call_key(step, _df().rename(columns={'Return': 'Ret'}), 'Company') != key
+    assert call_key(step, _df().astype({'Return': 'float32'}), 'Company') != key
+    assert call_key(step, [_df()], 'Company') != call_key(step, [changed_df], 'Company')
+
+    assert call_key(step, _df(), 'Company', scale=2) != key
+    assert call_key(step, _df(), ['Company']) != key
+
+    assert call_key(_define_step('df.groupby(by).sum() * scale'), _df(), 'Company') != key
+    assert call_key(_define_step('df.groupby(by).mean() * scale'), _df(), 'Company') == key
+
+
+def test_cached_function_runs_once_per_key(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls = []
+
+    @cache
+    def total(df, col):
+        calls.append(col)
+        return df[col].sum()
+
+    assert total(_df(), 'Return') == total(_df(), col='Return')
+    total(_df().iloc[:2], 'Return')
+    assert calls == ['Return', 'Return']
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def _store_used_at(cache: ResultCache, key: str, size: int, used_at: float):
+    cache.store(key, b'x' * size)
+    os.utime(cache.path(key), (used_at, used_at))
+
+
+def test_evict_removes_least_recently_used_until_under_max_bytes(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 6)
+    for key, used_at in [('newest', 4000), ('oldest', 1000), ('old', 2000), ('new', 3000)]:
+        _store_used_at(cache, key, 1000, used_at)
+    size = os.path.getsize(cache.path('oldest'))
+
+    # Reading a result marks it as used
+    assert cache.get('oldest')[0]
+    cache.evict(max_bytes=2 * size + 1)
+    assert sorted(os.listdir(str(tmp_path))) == ['newest.pkl', 'oldest.pkl']
+    cache.evict(max_bytes=2 * size)
+    assert sorted(os.listdir(str(tmp_path))) == ['newest.pkl', 'oldest.pkl']
+    cache.evict(max_bytes=size)
+    assert os.listdir(str(tmp_path)) == ['oldest.pkl']
+    assert cache.get('new') == (False, None)
+
+
+def test_store_evicts_beyond_max_bytes(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=2500)
+    for used_at, key in enumerate(['a', 'b', 'c'], start=1):
+        _store_used_at(cache, key, 1000, used_at)
+    # The last stored result is the most recently used, the first was evicted when it was stored
+    assert sorted(os.listdir(str(tmp_path))) == ['b.pkl', 'c.pkl']